@@ -19,6 +19,48 @@ class LinkedInConfig:
     access_token: str = getenv("LINKEDIN_ACCESS_TOKEN")
     author_urn: str = getenv("LINKEDIN_AUTHOR_URN")
     organization_urn: str = getenv("LINKEDIN_ORGANIZATION_URN")
+    # Publish steps (register, upload, share) are retried with jittered exponential backoff
+    retry_attempts: int = int(getenv("LINKEDIN_RETRY_ATTEMPTS", "4"))
+    retry_base_delay: float = float(getenv("LINKEDIN_RETRY_BASE_DELAY", "0.5"))
+    # Host of the OAuth authorization and token endpoints (the REST API base is providers.linkedin.base_url)
+    oauth_base_url: str = getenv("LINKEDIN_OAUTH_BASE_URL", "https://www.linkedin.com").rstrip("/")
+
+
+@dataclass
+class ProviderConfig:
+    # Default request timeout (seconds) and max concurrent in-flight requests
+    timeout: float
+    concurrency: int
+    # API origin, without a trailing slash; override to point at a proxy or a local fake
+    base_url: str = ""
+    # Token bucket: sustained requests per minute (0 = unlimited) and burst size
+    rpm: float = 0
+    burst: int = 10
+    # Circuit breaker: consecutive failures that open it (0 = disabled) and seconds before a trial request
+    breaker_failures: int = 5
+    breaker_reset_s: float = 30
+
+
+def _provider(prefix: str, timeout: float, concurrency: int, base_url: str = "", breaker_failures: int = 5) -> ProviderConfig:
+    return ProviderConfig(
+        timeout=float(getenv(f"{prefix}_TIMEOUT", str(timeout))),
+        concurrency=int(getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+        base_url=getenv(f"{prefix}_BASE_URL", base_url).rstrip("/"),
+        rpm=float(getenv(f"{prefix}_RPM", "0")),
+        burst=int(getenv(f"{prefix}_BURST", "10")),
+        breaker_failures=int(getenv(f"{prefix}_BREAKER_FAILURES", str(breaker_failures))),
+        breaker_reset_s=float(getenv(f"{prefix}_BREAKER_RESET_S", "30")),
+    )
+
+
+@dataclass
+class ProvidersConfig:
+    anthropic: ProviderConfig = field(default_factory=lambda: _provider("ANTHROPIC", 20, 64, "https://api.anthropic.com"))
+    perplexity: ProviderConfig = field(default_factory=lambda: _provider("PERPLEXITY", 15, 32, "https://api.perplexity.ai"))
+    openai: ProviderConfig = field(default_factory=lambda: _provider("OPENAI", 30, 16, "https://api.openai.com"))
+    linkedin: ProviderConfig = field(default_factory=lambda: _provider("LINKEDIN", 20, 16, "https://api.linkedin.com"))
+    # Arbitrary image hosts (generated image URLs, placeholders); one bad host must not trip a shared breaker
+    assets: ProviderConfig = field(default_factory=lambda: _provider("ASSETS", 20, 16, breaker_failures=0))
 
 
 @dataclass
@@ -28,7 +70,59 @@ class Settings:
     anthropic_api_key: str = getenv("ANTHROPIC_API_KEY")
     perplexity_api_key: str = getenv("PERPLEXITY_API_KEY")
     openai_api_key: str = getenv("OPENAI_API_KEY")
+    # Logging: level for the app.* loggers and line format ("text" or "json")
+    log_level: str = getenv("LOG_LEVEL", "INFO")
+    log_format: str = getenv("LOG_FORMAT", "text")
+    # Origin this API is reachable at; prefixes the /images/{id} URLs stored on posts
+    public_base_url: str = getenv("PUBLIC_BASE_URL", f"http://localhost:{getenv('PORT', '4000')}")
+    # Generated images are stored as JPEGs bounded to this many pixels on the long side and (best effort) bytes
+    image_max_side: int = int(getenv("IMAGE_MAX_SIDE", "1792"))
+    image_max_bytes: int = int(getenv("IMAGE_MAX_BYTES", str(1024 * 1024)))
+    # ReAct agent: compiled once per distinct (model, temperature, max tokens)
+    agent_model: str = getenv("AGENT_MODEL", "claude-3-5-sonnet-20240620")
+    agent_temperature: float = float(getenv("AGENT_TEMPERATURE", "0.7"))
+    agent_max_tokens: int = int(getenv("AGENT_MAX_TOKENS", "700"))
+    # Import LangChain/LangGraph and compile the agent during the startup warm-up instead of on the first request
+    agent_warmup: bool = getenv("AGENT_WARMUP", "true").lower() in ("1", "true", "yes")
+    # Keep-alive connections opened at startup to each provider with credentials (0 = none)
+    warmup_connections: int = int(getenv("WARMUP_CONNECTIONS", "2"))
+    # Research cache: in-memory LRU byte budget, entry TTL, and optional SQLite file for a persistent tier
+    research_cache_max_bytes: int = int(getenv("RESEARCH_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    research_cache_ttl_s: float = float(getenv("RESEARCH_CACHE_TTL_S", "3600"))
+    research_cache_path: str = getenv("RESEARCH_CACHE_PATH")
+    # Single-flight for paid regenerate-text / image calls: identical results are reused for this long
+    prompt_cache_ttl_s: float = float(getenv("PROMPT_CACHE_TTL_S", "30"))
+    prompt_cache_max_entries: int = int(getenv("PROMPT_CACHE_MAX_ENTRIES", "256"))
+    # Directory for posts, auth, jobs and stored images (default backend-py/data)
+    data_dir: str = getenv("DATA_DIR")
+    # Storage engine for posts and auth: "json" (default) or "sqlite"
+    store_driver: str = getenv("STORE_DRIVER", "json")
+    sqlite_path: str = getenv("SQLITE_PATH")
+    # Matches anyio's default threadpool size, which serves FastAPI's sync routes
+    sqlite_pool_size: int = int(getenv("SQLITE_POOL_SIZE", "40"))
+    # How often the SQLite engine looks for posts written by other processes (0 turns it off)
+    sqlite_poll_s: float = float(getenv("SQLITE_POLL_S", "2"))
+    # JSON store: the mutation journal is folded into posts.json once it passes this size
+    store_journal_compact_bytes: int = int(getenv("STORE_JOURNAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
+    store_journal_fsync: bool = getenv("STORE_JOURNAL_FSYNC", "true").lower() not in ("0", "false", "no")
+    # Background jobs: worker tasks draining the queue, and finished jobs kept for GET /jobs/{id}
+    job_workers: int = int(getenv("JOB_WORKERS", "4"))
+    # (at least 1: both job stores prune relative to it)
+    job_history: int = max(1, int(getenv("JOB_HISTORY", "1000")))
+    # A worker process whose heartbeat is older than this many seconds is presumed dead, and its publish
+    # claims and unfinished jobs are recovered by the other workers
+    worker_lease_s: float = float(getenv("WORKER_LEASE_S", "30"))
+    # Max scheduled publishes running at once
+    scheduler_concurrency: int = int(getenv("SCHEDULER_CONCURRENCY", "2"))
+    # Max drafts generated concurrently by POST /posts/generate/batch
+    batch_concurrency: int = int(getenv("BATCH_CONCURRENCY", "4"))
+    # Idea dedup: related prior ideas listed in the prompt, MinHash similarity that counts as a duplicate,
+    # and regenerations allowed before a duplicate is accepted
+    idea_prompt_top_k: int = int(getenv("IDEA_PROMPT_TOP_K", "20"))
+    idea_dup_threshold: float = float(getenv("IDEA_DUP_THRESHOLD", "0.6"))
+    idea_dup_retries: int = int(getenv("IDEA_DUP_RETRIES", "2"))
     linkedin: LinkedInConfig = field(default_factory=LinkedInConfig)
+    providers: ProvidersConfig = field(default_factory=ProvidersConfig)
 
 
 settings = Settings()
@@ -0,0 +1,44 @@
+"""One-shot import of the JSON store into SQLite.
+
+Usage (from backend-py/):
+    python -m app.db.migrate [--sqlite PATH]
+
+Reads data/posts.json (replaying any pending journal entries) and
+data/auth.json, and upserts everything into the SQLite database. Safe to
+re-run: rows are keyed by post id / auth key. The JSON files are only
+read, so this can run against a data directory a server is using.
+"""
+from __future__ import annotations
+import argparse
+from pathlib import Path
+from ..config import settings
+from .sqlite_store import ConnectionPool, _put_auth, _upsert_post
+from .store import AUTH_PATH, POSTS_JOURNAL_PATH, POSTS_PATH, SQLITE_PATH, _PostsIndex, _read_json
+
+
+def migrate(sqlite_path: Path) -> None:
+    # Read the JSON store as it stands: nothing is created or compacted in its data directory
+    source = _PostsIndex(POSTS_PATH, POSTS_JOURNAL_PATH, compact_bytes=settings.store_journal_compact_bytes, fsync=False)
+    # Oldest first so the SQLite insertion order matches the JSON store's newest-first listing
+    posts = list(reversed(source.snapshot()))
+    auth = _read_json(AUTH_PATH, {}) if AUTH_PATH.exists() else {}
+
+    pool = ConnectionPool(sqlite_path, size=1)
+    with pool.transaction() as conn:
+        for post in posts:
+            _upsert_post(conn, post)
+        for key, data in auth.items():
+            if isinstance(data, dict):
+                _put_auth(conn, key, data)
+    print(f"[MIGRATE] Imported posts={len(posts)} auth_keys={len(auth)} into {sqlite_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import data/posts.json and data/auth.json into SQLite.")
+    parser.add_argument("--sqlite", default=settings.sqlite_path or str(SQLITE_PATH), help="Target database path")
+    args = parser.parse_args()
+    migrate(Path(args.sqlite))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+from __future__ import annotations
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+from ..models import Job, Post, bucket_of
+from .store import SORT_FIELDS, SortKey, StatKey, _matches, _stat_key, sort_value
+from ..log import get_logger
+
+log = get_logger("store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    createdAt TEXT NOT NULL,
+    updatedAt TEXT NOT NULL,
+    data TEXT NOT NULL,
+    rev INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_posts_status ON posts (status, seq);
+CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (createdAt, id);
+CREATE INDEX IF NOT EXISTS idx_posts_updated ON posts (updatedAt, id);
+CREATE INDEX IF NOT EXISTS idx_posts_status_created ON posts (status, createdAt, id);
+CREATE INDEX IF NOT EXISTS idx_posts_status_updated ON posts (status, updatedAt, id);
+CREATE TABLE IF NOT EXISTS post_counts (
+    status TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (status, bucket)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    createdAt TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS auth (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared across worker threads.
+
+    Connections are opened lazily up to ``size``; callers beyond that block
+    until one is returned. Size it to the server's threadpool so every sync
+    route handler can hold a connection at once.
+    """
+
+    def __init__(self, path: Path, size: int) -> None:
+        self.path = path
+        self.size = max(1, size)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript(_SCHEMA)
+        _add_rev(conn)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if not can_open:
+            return self._idle.get()
+        try:
+            return self._open()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction. BEGIN IMMEDIATE takes the write lock up front so read-modify-write is atomic."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+def _row_values(post: Post) -> tuple:
+    return (post.id, post.status, post.createdAt.isoformat(), post.updatedAt.isoformat(), post.json_bytes().decode())
+
+
+class SqlitePosts:
+    """Posts table with the same surface as the JSON engine in store.py.
+
+    Every write stamps the row with the next ``rev``. With ``poll_s`` > 0 a thread looks for rows with a
+    higher rev than it has seen every ``poll_s`` seconds and passes those written by other processes to
+    ``on_external``, as the JSON engine does when it replays other writers' journal entries.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        on_external: Optional[Callable[[List[Post]], None]] = None,
+        poll_s: float = 0,
+    ) -> None:
+        self.pool = pool
+        self.on_external = on_external
+        self.poll_s = poll_s
+        self._lock = threading.Lock()
+        # Highest rev passed on (or written here), and revs written here that the poller has yet to pass
+        self._seen_rev = 0
+        self._own: Set[int] = set()
+        self._poller: Optional[threading.Thread] = None
+
+    def load(self) -> None:
+        # Opening a connection creates the schema; databases created before post_counts existed get it backfilled
+        with self.pool.transaction() as conn:
+            if conn.execute("SELECT 1 FROM post_counts LIMIT 1").fetchone() is None:
+                _rebuild_counts(conn)
+            seen = conn.execute("SELECT COALESCE(MAX(rev), 0) FROM posts").fetchone()[0]
+        with self._lock:
+            self._seen_rev = max(self._seen_rev, seen)
+            if self.poll_s > 0 and self.on_external is not None and self._poller is None:
+                self._poller = threading.Thread(target=self._poll_loop, name="posts-poller", daemon=True)
+                self._poller.start()
+        log.info("SQLite store ready at %s", self.pool.path)
+
+    def poll(self) -> None:
+        """Pass posts other processes wrote since the last poll to ``on_external``."""
+        with self._lock:
+            since = self._seen_rev
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT rev, data FROM posts WHERE rev > ? ORDER BY rev", (since,)).fetchall()
+        if not rows:
+            return
+        with self._lock:
+            self._seen_rev = max(self._seen_rev, rows[-1][0])
+            external = [data for rev, data in rows if rev not in self._own]
+            self._own = {rev for rev in self._own if rev > self._seen_rev}
+        if external and self.on_external is not None:
+            self.on_external([Post.model_validate_json(data) for data in external])
+
+    def _poll_loop(self) -> None:
+        while True:
+            time.sleep(self.poll_s)
+            try:
+                self.poll()
+            except Exception as e:
+                log.exception("Polling for external post writes failed: %r", e)
+
+    def _wrote(self, revs: List[int]) -> None:
+        with self._lock:
+            self._own.update(rev for rev in revs if rev > self._seen_rev)
+
+    def compact(self) -> None:
+        """Checkpoint the WAL back into the main database file."""
+        with self.pool.connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def all(self, status: Optional[str] = None) -> List[Post]:
+        with self.pool.connection() as conn:
+            if status:
+                rows = conn.execute("SELECT data FROM posts WHERE status = ? ORDER BY seq DESC", (status,)).fetchall()
+            else:
+                rows = conn.execute("SELECT data FROM posts ORDER BY seq DESC").fetchall()
+        return [Post.model_validate_json(r[0]) for r in rows]
+
+    def get(self, post_id: str) -> Optional[Post]:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM posts WHERE id = ?", (post_id,)).fetchone()
+        return Post.model_validate_json(row[0]) if row else None
+
+    def counts(self) -> Dict[StatKey, int]:
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT status, bucket, n FROM post_counts WHERE n > 0").fetchall()
+        return {(status, bucket or None): n for status, bucket, n in rows}
+
+    def page(self, *, status: Optional[str], sort: str, descending: bool, limit: int, after: Optional[SortKey]) -> List[Post]:
+        """Return up to ``limit`` posts ordered by (sort, id), strictly after the ``after`` key."""
+        assert sort in SORT_FIELDS  # interpolated into SQL below
+        op, direction = ("<", "DESC") if descending else (">", "ASC")
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if after:
+            clauses.append(f"({sort}, id) {op} (?, ?)")
+            params.extend([_sql_time(after[0]), after[1]])
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        sql = f"SELECT data FROM posts {where}ORDER BY {sort} {direction}, id {direction} LIMIT ?"
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, (*params, limit)).fetchall()
+        return [Post.model_validate_json(r[0]) for r in rows]
+
+    def put(self, post: Post) -> None:
+        with self.pool.transaction() as conn:
+            rev = _upsert_post(conn, post)
+        self._wrote([rev])
+
+    def put_many(self, posts: List[Post]) -> None:
+        with self.pool.transaction() as conn:
+            revs = [_upsert_post(conn, post) for post in posts]
+        self._wrote(revs)
+
+    def update(self, post_id: str, patch: Dict[str, Any], expect: Optional[Dict[str, Any]] = None) -> Optional[Post]:
+        with self.pool.transaction() as conn:
+            row = conn.execute("SELECT data FROM posts WHERE id = ?", (post_id,)).fetchone()
+            if not row:
+                return None
+            current = Post.model_validate_json(row[0])
+            if not _matches(current.model_dump(), expect):
+                return None
+            payload = json.loads(row[0])
+            payload.update(patch)
+            payload["updatedAt"] = datetime.utcnow()
+            updated = Post(**payload)
+            rev = _upsert_post(conn, updated)
+        self._wrote([rev])
+        return updated
+
+
+class SqliteAuth:
+    """Auth records, one JSON object per provider key."""
+
+    def __init__(self, pool: ConnectionPool) -> None:
+        self.pool = pool
+
+    def get(self, key: str) -> Dict[str, Any]:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM auth WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def set(self, key: str, data: Dict[str, Any]) -> None:
+        with self.pool.transaction() as conn:
+            _put_auth(conn, key, data)
+
+    def merge(self, key: str, data: Dict[str, Any]) -> None:
+        with self.pool.transaction() as conn:
+            row = conn.execute("SELECT data FROM auth WHERE key = ?", (key,)).fetchone()
+            _put_auth(conn, key, {**(json.loads(row[0]) if row else {}), **data})
+
+
+class SqliteJobs:
+    """Job records; only the newest ``keep`` finished jobs are retained."""
+
+    def __init__(self, pool: ConnectionPool, keep: int) -> None:
+        self.pool = pool
+        self.keep = keep
+        self._writes = 0
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def put(self, job: Job) -> None:
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, createdAt, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, data = excluded.data",
+                (job.id, job.status, _sql_time(job.createdAt), job.model_dump_json()),
+            )
+            self._writes += 1
+            if self._writes % self.keep == 0:
+                conn.execute(
+                    "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND id NOT IN "
+                    "(SELECT id FROM jobs ORDER BY createdAt DESC LIMIT ?)",
+                    (self.keep,),
+                )
+
+    def unfinished(self) -> List[Job]:
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT data FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        return [Job.model_validate_json(r[0]) for r in rows]
+
+
+def _sql_time(value: datetime) -> str:
+    # Fixed-width so lexicographic order in SQLite matches chronological order
+    return sort_value(value).isoformat(timespec="microseconds")
+
+
+def _bump_count(conn: sqlite3.Connection, key: StatKey, delta: int) -> None:
+    conn.execute(
+        "INSERT INTO post_counts (status, bucket, n) VALUES (?, ?, ?) "
+        "ON CONFLICT(status, bucket) DO UPDATE SET n = n + excluded.n",
+        (key[0], key[1] or "", delta),
+    )
+
+
+def _rebuild_counts(conn: sqlite3.Connection) -> None:
+    counts: Dict[StatKey, int] = {}
+    for status, idea in conn.execute("SELECT status, json_extract(data, '$.idea') FROM posts"):
+        key = (status, bucket_of(idea))
+        counts[key] = counts.get(key, 0) + 1
+    conn.execute("DELETE FROM post_counts")
+    for key, n in counts.items():
+        _bump_count(conn, key, n)
+
+
+def _add_rev(conn: sqlite3.Connection) -> None:
+    """Give databases created before change polling the ``rev`` column, then index it."""
+    if not any(col[1] == "rev" for col in conn.execute("PRAGMA table_info(posts)")):
+        try:
+            conn.execute("ALTER TABLE posts ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError as e:
+            # Another connection added it first
+            if "duplicate column" not in str(e):
+                raise
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_rev ON posts (rev)")
+
+
+def _upsert_post(conn: sqlite3.Connection, post: Post) -> int:
+    """Insert or replace a post and move it between post_counts cells, and return its new rev. Call inside a
+    transaction: the write lock it holds makes the rev unique."""
+    prev = conn.execute("SELECT status, json_extract(data, '$.idea') FROM posts WHERE id = ?", (post.id,)).fetchone()
+    key = _stat_key(post)
+    if prev is None or (prev[0], bucket_of(prev[1])) != key:
+        if prev is not None:
+            _bump_count(conn, (prev[0], bucket_of(prev[1])), -1)
+        _bump_count(conn, key, 1)
+    rev = conn.execute("SELECT COALESCE(MAX(rev), 0) + 1 FROM posts").fetchone()[0]
+    conn.execute(
+        "INSERT INTO posts (id, status, createdAt, updatedAt, data, rev) VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET status = excluded.status, createdAt = excluded.createdAt, "
+        "updatedAt = excluded.updatedAt, data = excluded.data, rev = excluded.rev",
+        (post.id, post.status, _sql_time(post.createdAt), _sql_time(post.updatedAt), post.json_bytes().decode(), rev),
+    )
+    return rev
+
+
+def _put_auth(conn: sqlite3.Connection, key: str, data: Dict[str, Any]) -> None:
+    conn.execute(
+        "INSERT INTO auth (key, data) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+        (key, json.dumps(data, ensure_ascii=False)),
+    )
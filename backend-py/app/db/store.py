@@ -1,14 +1,35 @@
 from __future__ import annotations
+import base64
 import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-from ..models import Post, PostStatus
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from .. import metrics
+from ..config import settings
+from ..models import BUCKETS, Job, Post, PostStatus, bucket_of
+from ..log import get_logger
 
-DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so only a single process may use DATA_DIR
+    fcntl = None  # type: ignore[assignment]
+
+log = get_logger("store")
+
+DATA_DIR = Path(settings.data_dir) if settings.data_dir else Path(__file__).resolve().parents[2] / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 POSTS_PATH = DATA_DIR / "posts.json"
+POSTS_JOURNAL_PATH = DATA_DIR / "posts.journal.jsonl"
 AUTH_PATH = DATA_DIR / "auth.json"
+SQLITE_PATH = DATA_DIR / "store.db"
+JOBS_PATH = DATA_DIR / "jobs.jsonl"
 
 
 def _ensure_file(path: Path, default: str) -> None:
@@ -19,107 +40,821 @@ def _ensure_file(path: Path, default: str) -> None:
 
 def _read_json(path: Path, fallback: Any) -> Any:
     _ensure_file(path, json.dumps(fallback))
-    print(f"[STORE] Reading JSON from {path}")
+    log.debug("Reading JSON from %s", path)
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
-        print(f"[STORE] Read OK from {path}")
         return data
     except Exception:
-        print(f"[STORE] Failed reading {path}, returning fallback.")
+        log.warning("Failed reading %s, returning fallback", path)
         return fallback
 
 
-def _write_json(path: Path, data: Any) -> None:
-    print(f"[STORE] Writing JSON to {path}")
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
-    print(f"[STORE] Write complete to {path}")
+def _write_bytes_atomic(path: Path, data: bytes) -> None:
+    """Write to a sibling temp file and rename over the target so readers never see a partial file.
+    Callers writing from several processes must hold a file lock, since the temp name is shared."""
+    log.debug("Writing %s atomically", path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _inode(path: Path) -> int:
+    """Inode of ``path``, or 0 if it does not exist; a changed inode means the file was replaced."""
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return 0
+
+
+class _FileLock:
+    """Advisory lock (flock) on a sidecar file, coordinating processes that share DATA_DIR.
+
+    Not a thread lock: callers hold the owning object's threading lock, and
+    nested holds on that thread are counted instead of re-locking.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fd: Optional[int] = None
+        self._depth = 0
+        self._exclusive = False
+        if hasattr(os, "register_at_fork"):
+            # A forked worker (e.g. gunicorn --preload) would share the parent's open file description,
+            # and flock does not exclude holders of the same description, so children open their own
+            os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd, self._depth = None, 0
+
+    @contextmanager
+    def hold(self, exclusive: bool = True) -> Iterator[None]:
+        if self._depth:
+            # flock cannot upgrade atomically, so a shared hold must not nest an exclusive one
+            assert self._exclusive or not exclusive, f"exclusive lock on {self.path} requested under a shared one"
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._depth, self._exclusive = 1, exclusive
+        try:
+            yield
+        finally:
+            self._depth = 0
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class _Version:
+    """Store version shared by every process on DATA_DIR. Holds a counter bumped by each journal append,
+    the counter's value when the current journal was started (which names that journal's generation) and
+    the previous journal's generation. The sidecar is memory-mapped, so the check a read makes before
+    trusting its in-memory copy is a memory load, not a syscall."""
+
+    _FORMAT = struct.Struct("<QQQ")
+
+    def __init__(self, path: Path) -> None:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < self._FORMAT.size:
+                os.ftruncate(fd, self._FORMAT.size)
+            self._map = mmap.mmap(fd, self._FORMAT.size)
+        finally:
+            os.close(fd)
+
+    @property
+    def current(self) -> int:
+        return self._FORMAT.unpack_from(self._map, 0)[0]
+
+    def read(self) -> Tuple[int, int, int]:
+        """(version, current journal generation, rotated journal generation)."""
+        return self._FORMAT.unpack_from(self._map, 0)
+
+    def write(self, version: int, journal_gen: int, rotated_gen: int) -> None:
+        """Only under the store's exclusive file lock."""
+        self._FORMAT.pack_into(self._map, 0, version, journal_gen, rotated_gen)
 
 
 def _now_iso() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
-class PostsStore:
-    @staticmethod
-    def get_all(status: Optional[PostStatus] = None) -> List[Post]:
-        print("[STORE] PostsStore.get_all called")
-        raw = _read_json(POSTS_PATH, [])
-        items: List[Post] = []
-        for obj in raw:
+SORT_FIELDS = ("createdAt", "updatedAt")
+# Key type for keyset pagination: (sort value, post id)
+SortKey = Tuple[datetime, str]
+
+
+def sort_value(value: datetime) -> datetime:
+    """Normalize to naive UTC so timestamps written with and without an offset compare cleanly."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _sort_key(post: Post, field: str) -> SortKey:
+    return sort_value(getattr(post, field)), post.id
+
+
+# (status, content bucket or None): the grain of the per-post counters behind PostsStore.stats()
+StatKey = Tuple[str, Optional[str]]
+
+
+def _stat_key(post: Post) -> StatKey:
+    return post.status, bucket_of(post.idea)
+
+
+def _matches(current: Dict[str, Any], expect: Optional[Dict[str, Any]]) -> bool:
+    return not expect or all(current.get(k) == v for k, v in expect.items())
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _PostsIndex:
+    """Resident copy of the posts with an id index and a status index.
+
+    State on disk is a snapshot (posts.json) plus an append-only JSON-lines
+    journal of mutations since that snapshot. Startup loads the snapshot and
+    replays the journal; every mutation appends one fsynced line. A background
+    thread folds the journal into a fresh snapshot once it grows past
+    ``compact_bytes``.
+
+    Several processes (e.g. ``uvicorn --workers N``) may share the files. Writes
+    hold an exclusive flock on posts.lock, apply whatever other processes
+    appended since this one last looked, and only then check ``expect`` and
+    append, so no update is lost. Each append bumps the shared counter in
+    posts.version; reads compare it with the last value seen and, only when
+    another process has written, replay the journal from the last byte offset
+    applied (or reload, if a compaction elsewhere made that impossible).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        journal_path: Path,
+        compact_bytes: int,
+        fsync: bool,
+        on_external: Optional[Callable[[List[Post]], None]] = None,
+    ) -> None:
+        self.path = path
+        self.journal_path = journal_path
+        # Journal being folded into a snapshot; replayed on startup if a compaction was interrupted
+        self.rotated_path = journal_path.with_suffix(journal_path.suffix + ".old")
+        self.version_path = path.with_suffix(".version")
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        # Called, outside the locks, with posts written by other processes once they have been applied here
+        self.on_external = on_external
+        self._lock = threading.RLock()
+        self._file_lock = _FileLock(path.with_suffix(".lock"))
+        # Serializes compactions: between threads here, and via the flock between processes
+        self._compacting = threading.Lock()
+        self._compact_file_lock = _FileLock(path.with_suffix(".compact.lock"))
+        self._loaded = False
+        # id -> Post; insertion order is oldest-first, so reversed() yields file order
+        self._by_id: Dict[str, Post] = {}
+        self._seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self._by_status: Dict[str, Set[str]] = {}
+        # (status, bucket or None) -> number of posts; maintained on every write so stats never scan
+        self._counts: Dict[StatKey, int] = {}
+        # (sort field, status or None) -> ascending list of (value, id) for keyset pagination
+        self._sorted: Dict[Tuple[str, Optional[str]], List[SortKey]] = {}
+        self._journal: Optional[IO[bytes]] = None
+        # Generation of the journal applied so far, the byte offset up to which it has been applied,
+        # and the generation the append handle was opened on
+        self._journal_gen = 0
+        self._journal_bytes = 0
+        self._handle_gen = -1
+        self._version: Optional[_Version] = None
+        # Shared version this copy reflects
+        self._seen = 0
+        self._external: List[Post] = []
+        self._compact_due = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._version = _Version(self.version_path)
+            with self._file_lock.hold(exclusive=False):
+                replayed = self._reload()
+            self._loaded = True
+            log.info("Loaded posts into memory count=%d journal_entries=%d", len(self._by_id), replayed)
+        if self._journal_bytes >= self.compact_bytes or self.rotated_path.exists():
+            self._request_compaction()
+
+    def _reload(self) -> int:
+        """Rebuild everything from the files. Caller holds the file lock."""
+        assert self._version is not None
+        count = self._read_files(_read_json(self.path, []))
+        self._seen, self._journal_gen, _ = self._version.read()
+        return count
+
+    def _read_files(self, raw: Any) -> int:
+        """Rebuild the indexes from the decoded snapshot ``raw`` and the journals; returns entries replayed."""
+        self._by_id.clear()
+        self._seq.clear()
+        self._by_status.clear()
+        self._counts.clear()
+        self._sorted.clear()
+        self._next_seq = 0
+        # Snapshot is newest-first; insert oldest-first so sequence numbers grow with recency
+        for obj in reversed(raw if isinstance(raw, list) else []):
             try:
                 # Pydantic will parse ISO strings into datetime
-                items.append(Post(**obj))
+                self._put(Post(**obj))
             except Exception:
                 continue
-        print(f"[STORE] Loaded posts count={len(items)}")
-        if status:
-            print(f"[STORE] Filtering by status={status}")
-            items = [p for p in items if p.status == status]
-            print(f"[STORE] Filtered posts count={len(items)}")
-        return items
+        replayed, _ = self._replay(self.rotated_path)
+        count, self._journal_bytes = self._replay(self.journal_path)
+        return replayed + count
+
+    def snapshot(self) -> List[Post]:
+        """Read the posts as the files hold them now, newest first, without writing anything to the data
+        directory: no lock, version sidecar or missing file is created and nothing is compacted. For tools
+        reading a directory a server may be using (the SQLite import). If a server has written here, its
+        posts.lock exists and is held shared meanwhile, so a compaction cannot move the journal mid-read.
+        Leaves this index unloaded; a later read loads it as usual."""
+        try:
+            fd: Optional[int] = os.open(self._file_lock.path, os.O_RDONLY)
+        except FileNotFoundError:
+            fd = None
+        try:
+            if fd is not None and fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+            with self._lock:
+                assert not self._loaded, "snapshot() of a loaded index"
+                self._read_files(_read_json(self.path, []) if self.path.exists() else [])
+                return [self._by_id[k] for k in reversed(self._by_id)]
+        finally:
+            # Closing the descriptor releases the flock
+            if fd is not None:
+                os.close(fd)
+
+    def _replay(self, path: Path, offset: int = 0, applied: Optional[List[Post]] = None) -> Tuple[int, int]:
+        """Apply complete journal lines from byte ``offset``. Returns (entries applied, offset after them)."""
+        if not path.exists():
+            return 0, offset
+        count = 0
+        with path.open("rb") as fh:
+            fh.seek(offset)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    # A torn final line from a crash mid-append (or one being written); stop before it
+                    break
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                    if entry["op"] == "put":
+                        posts = [Post(**entry["post"])]
+                    elif entry["op"] == "put_many":
+                        posts = [Post(**obj) for obj in entry["posts"]]
+                    elif entry["op"] == "patch":
+                        p = self._by_id.get(entry["id"])
+                        posts = [Post(**{**p.model_dump(), **entry["patch"]})] if p is not None else []
+                    else:
+                        continue
+                except Exception:
+                    continue
+                for post in posts:
+                    self._put(post)
+                if applied is not None:
+                    applied.extend(posts)
+                count += 1
+        return count, offset
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def _sync(self) -> None:
+        """Catch up with other processes' writes, if there were any. Caller holds the thread lock."""
+        assert self._version is not None
+        if self._version.current == self._seen:
+            return
+        with self._file_lock.hold(exclusive=False):
+            self._catch_up()
+
+    def _catch_up(self) -> None:
+        """Apply journal entries appended elsewhere since ``_seen``. Caller holds the file lock."""
+        assert self._version is not None
+        version, journal_gen, rotated_gen = self._version.read()
+        if version == self._seen:
+            return
+        if journal_gen != self._journal_gen:
+            # Another process rotated the journal we were reading. The rotation itself took version
+            # journal_gen; if we had not seen every append before it, the rest is in the rotated file,
+            # unless that has been compacted away (or rotated again) too
+            if self._seen + 1 < journal_gen:
+                if rotated_gen != self._journal_gen or not self.rotated_path.exists():
+                    count = self._reload()
+                    self._external.extend(self._by_id.values())
+                    log.info("Reloaded posts after compaction in another process count=%d journal_entries=%d", len(self._by_id), count)
+                    return
+                self._replay(self.rotated_path, self._journal_bytes, self._external)
+            self._journal_gen, self._journal_bytes = journal_gen, 0
+        _, self._journal_bytes = self._replay(self.journal_path, self._journal_bytes, self._external)
+        self._seen = version
+
+    @contextmanager
+    def _reading(self) -> Iterator[None]:
+        with self._lock:
+            self._ensure_loaded()
+            self._sync()
+            yield
+        self._deliver_external()
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        with self._lock:
+            self._ensure_loaded()
+            with self._file_lock.hold():
+                # Apply other writers' entries first, so ``expect`` is checked against the latest state
+                self._catch_up()
+                if self._journal is None or self._handle_gen != self._journal_gen:
+                    if self._journal is not None:
+                        self._journal.close()
+                    self._journal = self.journal_path.open("ab")
+                    self._handle_gen = self._journal_gen
+                yield
+        self._deliver_external()
+
+    def _deliver_external(self) -> None:
+        with self._lock:
+            posts, self._external = self._external, []
+        if posts and self.on_external is not None:
+            self.on_external(posts)
+
+    def _put(self, post: Post) -> None:
+        prev = self._by_id.get(post.id)
+        if prev is not None:
+            if prev.status != post.status:
+                self._by_status.get(prev.status, set()).discard(post.id)
+            self._counts[_stat_key(prev)] -= 1
+            for field in SORT_FIELDS:
+                key = _sort_key(prev, field)
+                for scope in (None, prev.status):
+                    keys = self._sorted[(field, scope)]
+                    i = bisect_left(keys, key)
+                    if i < len(keys) and keys[i] == key:
+                        del keys[i]
+        else:
+            self._seq[post.id] = self._next_seq
+            self._next_seq += 1
+        self._by_id[post.id] = post
+        self._by_status.setdefault(post.status, set()).add(post.id)
+        key = _stat_key(post)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        for field in SORT_FIELDS:
+            key = _sort_key(post, field)
+            for scope in (None, post.status):
+                insort(self._sorted.setdefault((field, scope), []), key)
+
+    def _append(self, line: str) -> None:
+        """Append one entry and publish it to other processes. Only inside ``_writing()``."""
+        assert self._journal is not None and self._version is not None
+        data = (line + "\n").encode("utf-8")
+        self._journal.write(data)
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._journal_bytes += len(data)
+        self._seen += 1
+        self._version.write(self._seen, self._journal_gen, self._version.read()[2])
+        if self._journal_bytes >= self.compact_bytes:
+            self._request_compaction()
+
+    def all(self, status: Optional[str] = None) -> List[Post]:
+        with self._reading():
+            if not status:
+                return [self._by_id[k] for k in reversed(self._by_id)]
+            ids = sorted(self._by_status.get(status, ()), key=self._seq.__getitem__, reverse=True)
+            return [self._by_id[k] for k in ids]
+
+    def get(self, post_id: str) -> Optional[Post]:
+        with self._reading():
+            return self._by_id.get(post_id)
+
+    def counts(self) -> Dict[StatKey, int]:
+        with self._reading():
+            return {k: n for k, n in self._counts.items() if n}
+
+    def page(self, *, status: Optional[str], sort: str, descending: bool, limit: int, after: Optional[SortKey]) -> List[Post]:
+        """Return up to ``limit`` posts ordered by (sort, id), strictly after the ``after`` key."""
+        with self._reading():
+            keys = self._sorted.get((sort, status or None), [])
+            if descending:
+                end = bisect_left(keys, after) if after else len(keys)
+                window = keys[max(0, end - limit):end][::-1]
+            else:
+                start = bisect_right(keys, after) if after else 0
+                window = keys[start:start + limit]
+            return [self._by_id[post_id] for _, post_id in window]
+
+    def put(self, post: Post) -> None:
+        with self._writing():
+            self._append('{"op":"put","post":' + post.json_bytes().decode() + "}")
+            self._put(post)
+
+    def put_many(self, posts: List[Post]) -> None:
+        with self._writing():
+            # One journal line, so the batch is replayed all-or-nothing
+            self._append('{"op":"put_many","posts":[' + ",".join(p.json_bytes().decode() for p in posts) + "]}")
+            for post in posts:
+                self._put(post)
+
+    def update(self, post_id: str, patch: Dict[str, Any], expect: Optional[Dict[str, Any]] = None) -> Optional[Post]:
+        with self._writing():
+            p = self._by_id.get(post_id)
+            if p is None or not _matches(p.model_dump(), expect):
+                return None
+            patch = {**patch, "updatedAt": datetime.utcnow()}
+            updated = Post(**{**p.model_dump(), **patch})
+            # Only the changed fields are journaled, so a status flip costs a few dozen bytes
+            self._append(json.dumps({"op": "patch", "id": post_id, "patch": patch}, default=_json_default, ensure_ascii=False))
+            self._put(updated)
+        return updated
+
+    def _request_compaction(self) -> None:
+        self._compact_due.set()
+        with self._lock:
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self._compact_loop, name="posts-compactor", daemon=True)
+                self._compactor.start()
+
+    def _compact_loop(self) -> None:
+        while True:
+            self._compact_due.wait()
+            self._compact_due.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                log.exception("Journal compaction failed: %r", e)
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot and start an empty journal."""
+        with self._compacting, self._compact_file_lock.hold():
+            with self._lock:
+                if not self._loaded:
+                    return
+                assert self._version is not None
+                with self._file_lock.hold():
+                    # Another process may have compacted while this one waited; look at the files as they are now
+                    self._catch_up()
+                    if self._journal_bytes == 0 and not self.rotated_path.exists():
+                        return
+                    # Rotate under the lock so new appends land in a fresh journal while the snapshot is written
+                    if not self.rotated_path.exists():
+                        if self._journal is not None:
+                            self._journal.close()
+                            self._journal = None
+                        os.replace(self.journal_path, self.rotated_path)
+                        # Rotating takes a version of its own, which also names the new journal's generation
+                        self._seen += 1
+                        self._version.write(self._seen, self._seen, self._journal_gen)
+                        self._journal_gen, self._journal_bytes = self._seen, 0
+                # Posts are replaced, never mutated, so a shallow snapshot is safe to encode unlocked
+                snapshot = [self._by_id[k] for k in reversed(self._by_id)]
+            # One post per line, spliced from the encodings already cached for the journal and API responses
+            _write_bytes_atomic(self.path, b"[\n" + b",\n".join(p.json_bytes() for p in snapshot) + b"\n]\n")
+            # The snapshot now covers everything in the rotated journal. Drop it under the file lock, so a
+            # process reloading elsewhere reads either the old snapshot and the rotated journal or the new snapshot
+            with self._lock, self._file_lock.hold():
+                self.rotated_path.unlink(missing_ok=True)
+        self._deliver_external()
+        log.info("Journal compacted into snapshot posts=%d", len(snapshot))
+
+
+class _JsonAuth:
+    """Auth records in auth.json, one object per provider key."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        # Serializes read-modify-write of the file: the thread lock within this process, the flock across processes
+        self._lock = threading.Lock()
+        self._file_lock = _FileLock(path.with_suffix(".lock"))
+
+    def get(self, key: str) -> Dict[str, Any]:
+        raw = _read_json(self.path, {})
+        return raw.get(key, {})
+
+    def _write(self, raw: Dict[str, Any]) -> None:
+        # Atomic, so a concurrent get() never reads a half-written file as empty
+        _write_bytes_atomic(self.path, (json.dumps(raw, indent=2, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def set(self, key: str, data: Dict[str, Any]) -> None:
+        with self._lock, self._file_lock.hold():
+            raw = _read_json(self.path, {})
+            raw[key] = data
+            self._write(raw)
+
+    def merge(self, key: str, data: Dict[str, Any]) -> None:
+        with self._lock, self._file_lock.hold():
+            raw = _read_json(self.path, {})
+            raw[key] = {**raw.get(key, {}), **data}
+            self._write(raw)
+
+
+class _JsonJobs:
+    """Job records as an append-only JSON-lines log; the last line for an id wins.
+
+    Only the newest ``keep`` jobs are retained. The log is rewritten with just
+    the retained records on load and whenever it grows past a few times that.
+    Appends and rewrites hold an flock on jobs.lock, and reads pick up lines
+    other processes appended (or a rewrite they made) by checking the log's
+    inode and size, so every worker sees every job.
+    """
+
+    def __init__(self, path: Path, keep: int, fsync: bool) -> None:
+        self.path = path
+        self.keep = keep
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file_lock = _FileLock(path.with_suffix(".lock"))
+        self._loaded = False
+        self._jobs: Dict[str, Job] = {}
+        self._log: Optional[IO[str]] = None
+        self._lines = 0
+        # Inode of the log read so far and the byte offset read up to
+        self._ino = 0
+        self._offset = 0
+
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            with self._file_lock.hold():
+                self._refresh()
+                self._rewrite()
+            self._loaded = True
+
+    def _refresh(self) -> None:
+        """Read lines appended since the last call, starting over if the log was rewritten. Caller holds the thread lock."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._ino:
+            self._ino, self._offset = st.st_ino, 0
+        if st.st_size == self._offset:
+            return
+        with self.path.open("rb") as fh:
+            fh.seek(self._offset)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    # Still being appended (or torn by a crash); read it next time
+                    break
+                self._offset += len(line)
+                try:
+                    job = Job.model_validate_json(line)
+                except Exception:
+                    continue
+                # Re-insert so dict order follows the latest write
+                self._jobs.pop(job.id, None)
+                self._jobs[job.id] = job
+
+    def _rewrite(self) -> None:
+        """Caller holds both locks."""
+        excess = len(self._jobs) - self.keep
+        if excess > 0:
+            finished = [j for j in self._jobs.values() if j.status in ("succeeded", "failed")]
+            for job in sorted(finished, key=lambda j: j.createdAt)[:excess]:
+                del self._jobs[job.id]
+        if self._log is not None:
+            self._log.close()
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text("".join(j.model_dump_json() + "\n" for j in self._jobs.values()), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._log = self.path.open("a", encoding="utf-8")
+        self._lines = len(self._jobs)
+        st = os.fstat(self._log.fileno())
+        self._ino, self._offset = st.st_ino, st.st_size
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.load()
+        with self._lock:
+            self._refresh()
+            return self._jobs.get(job_id)
+
+    def put(self, job: Job) -> None:
+        self.load()
+        with self._lock, self._file_lock.hold():
+            assert self._log is not None
+            if os.fstat(self._log.fileno()).st_ino != _inode(self.path):
+                # Another process rewrote the log; appending to the replaced file would lose this line
+                self._log.close()
+                self._log = self.path.open("a", encoding="utf-8")
+            self._log.write(job.model_dump_json() + "\n")
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._jobs.pop(job.id, None)
+            self._jobs[job.id] = job
+            self._lines += 1
+            if self._lines > 4 * self.keep:
+                # Fold in other processes' lines first so the rewrite keeps them
+                self._refresh()
+                self._rewrite()
+
+    def unfinished(self) -> List[Job]:
+        self.load()
+        with self._lock:
+            self._refresh()
+            return [j for j in self._jobs.values() if j.status in ("queued", "running")]
+
+
+def _open_engines() -> Tuple[Any, Any, Any]:
+    """Build the posts, auth and jobs engines for the configured STORE_DRIVER."""
+    driver = settings.store_driver.lower()
+    if driver == "sqlite":
+        from .sqlite_store import ConnectionPool, SqliteAuth, SqliteJobs, SqlitePosts
+
+        pool = ConnectionPool(Path(settings.sqlite_path) if settings.sqlite_path else SQLITE_PATH, settings.sqlite_pool_size)
+        # Writes by other processes are only found by polling; they reach the same listeners as the JSON engine's
+        posts = SqlitePosts(pool, on_external=lambda posts: _notify(posts), poll_s=settings.sqlite_poll_s)
+        return posts, SqliteAuth(pool), SqliteJobs(pool, keep=settings.job_history)
+    if driver != "json":
+        raise RuntimeError(f"Unknown STORE_DRIVER {settings.store_driver!r}; expected 'json' or 'sqlite'")
+    posts = _PostsIndex(
+        POSTS_PATH,
+        POSTS_JOURNAL_PATH,
+        compact_bytes=settings.store_journal_compact_bytes,
+        fsync=settings.store_journal_fsync,
+        # Keep derived indexes current with writes made by other worker processes
+        on_external=lambda posts: _notify(posts),
+    )
+    jobs = _JsonJobs(JOBS_PATH, keep=settings.job_history, fsync=settings.store_journal_fsync)
+    return posts, _JsonAuth(AUTH_PATH), jobs
+
+
+_posts, _auth, _jobs = _open_engines()
+
+
+def encode_cursor(key: SortKey) -> str:
+    raw = json.dumps([key[0].isoformat(), key[1]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, post_id = json.loads(raw)
+        return sort_value(datetime.fromisoformat(value)), str(post_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+# Called with each post after it is written (here or, with the JSON store, by another process), e.g. to keep derived indexes current
+_listeners: List[Callable[[Post], None]] = []
+
+
+def _notify(posts: List[Post]) -> None:
+    for listener in _listeners:
+        for post in posts:
+            try:
+                listener(post)
+            except Exception as e:
+                log.exception("Post listener %r failed: %r", listener, e)
+
+
+class PostsStore:
+    @staticmethod
+    def on_change(listener: Callable[[Post], None]) -> None:
+        """Register a callback invoked with every post written through upsert, upsert_many or update_fields,
+        here or by another process. It may run on any thread."""
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+    @staticmethod
+    def load() -> None:
+        """Open the posts engine (JSON: load posts.json and replay the journal). Called at startup; otherwise happens on first access."""
+        _posts.load()
+
+    @staticmethod
+    def compact() -> None:
+        """Fold pending writes into the primary file (JSON snapshot or SQLite main db)."""
+        _posts.compact()
+
+    @staticmethod
+    @metrics.timed("store.get_all")
+    def get_all(status: Optional[PostStatus] = None) -> List[Post]:
+        return _posts.all(status)
 
     @staticmethod
+    @metrics.timed("store.get")
     def get_by_id(post_id: str) -> Optional[Post]:
-        print(f"[STORE] PostsStore.get_by_id called with id={post_id}")
-        items = PostsStore.get_all()
-        for p in items:
-            if p.id == post_id:
-                print("[STORE] Post found by id")
-                return p
-        print("[STORE] Post not found by id")
-        return None
+        return _posts.get(post_id)
+
+    @staticmethod
+    @metrics.timed("store.stats")
+    def stats() -> Dict[str, Any]:
+        """Post counts by status and by content bucket, read from counters maintained on every write."""
+        counts = _posts.counts()
+        by_status: Dict[str, int] = {}
+        by_bucket = {b: 0 for b in BUCKETS}
+        for (status, bucket), n in counts.items():
+            by_status[status] = by_status.get(status, 0) + n
+            if bucket is not None:
+                by_bucket[bucket] += n
+        return {"total": sum(counts.values()), "byStatus": by_status, "byBucket": by_bucket}
 
     @staticmethod
+    def bucket_counts() -> Dict[str, int]:
+        """Posts per content bucket across all statuses, as used for picking the least-used bucket."""
+        return PostsStore.stats()["byBucket"]
+
+    @staticmethod
+    @metrics.timed("store.get_page")
+    def get_page(
+        *,
+        status: Optional[PostStatus] = None,
+        sort: str = "createdAt",
+        order: str = "desc",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Post], Optional[str]]:
+        """Keyset pagination over (sort, id). Returns the page and the cursor for the next one (None at the end)."""
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field {sort!r}")
+        after = decode_cursor(cursor) if cursor else None
+        # Fetch one extra row to learn whether another page exists
+        items = _posts.page(status=status, sort=sort, descending=order == "desc", limit=limit + 1, after=after)
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, encode_cursor(_sort_key(items[-1], sort))
+
+    @staticmethod
+    @metrics.timed("store.upsert")
     def upsert(post: Post) -> Post:
-        print(f"[STORE] PostsStore.upsert called for id={post.id}")
-        items = PostsStore.get_all()
-        for i, p in enumerate(items):
-            if p.id == post.id:
-                print("[STORE] Existing post found. Updating in-place.")
-                items[i] = post
-                break
-        else:
-            print("[STORE] New post. Inserting at beginning.")
-            items.insert(0, post)
-        # Serialize datetimes as ISO
-        data = [json.loads(i.model_dump_json()) for i in items]
-        _write_json(POSTS_PATH, data)
-        print("[STORE] Upsert complete.")
+        log.debug("upsert id=%s", post.id)
+        _posts.put(post)
+        _notify([post])
         return post
 
     @staticmethod
-    def update_fields(post_id: str, patch: Dict[str, Any]) -> Optional[Post]:
-        print(f"[STORE] PostsStore.update_fields called id={post_id} patch_keys={list(patch.keys())}")
-        items = PostsStore.get_all()
-        for i, p in enumerate(items):
-            if p.id == post_id:
-                payload = p.model_dump()
-                payload.update(patch)
-                payload["updatedAt"] = datetime.utcnow()
-                updated = Post(**payload)
-                items[i] = updated
-                data = [json.loads(x.model_dump_json()) for x in items]
-                _write_json(POSTS_PATH, data)
-                print("[STORE] Update fields complete.")
-                return updated
-        print("[STORE] Post to update not found.")
-        return None
+    @metrics.timed("store.upsert_many")
+    def upsert_many(posts: List[Post]) -> List[Post]:
+        """Upsert several posts in one transaction, in order (as if upserted one after another)."""
+        log.debug("upsert_many count=%d", len(posts))
+        if posts:
+            _posts.put_many(posts)
+            _notify(posts)
+        return posts
+
+    @staticmethod
+    @metrics.timed("store.update_fields")
+    def update_fields(post_id: str, patch: Dict[str, Any], *, expect: Optional[Dict[str, Any]] = None) -> Optional[Post]:
+        """Apply ``patch``. With ``expect``, only if every listed field currently has the given value (compare-and-set);
+        returns None when the post is missing or does not match."""
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("update_fields id=%s patch_keys=%s", post_id, list(patch))
+        updated = _posts.update(post_id, patch, expect)
+        if updated is None:
+            log.debug("Post id=%s not found or not in the expected state", post_id)
+        else:
+            _notify([updated])
+        return updated
 
 
 class AuthStore:
     @staticmethod
     def get_linkedin() -> Dict[str, Any]:
-        raw = _read_json(AUTH_PATH, {})
-        return raw.get("linkedin", {})
+        return _auth.get("linkedin")
 
     @staticmethod
     def set_linkedin(data: Dict[str, Any]) -> None:
-        raw = _read_json(AUTH_PATH, {})
-        raw["linkedin"] = {**raw.get("linkedin", {}), **data}
-        _write_json(AUTH_PATH, raw)
+        _auth.merge("linkedin", data)
 
     @staticmethod
     def clear_linkedin() -> None:
-        raw = _read_json(AUTH_PATH, {})
-        raw["linkedin"] = {}
-        _write_json(AUTH_PATH, raw)
+        _auth.set("linkedin", {})
+
+
+class JobsStore:
+    @staticmethod
+    def get(job_id: str) -> Optional[Job]:
+        return _jobs.get(job_id)
+
+    @staticmethod
+    def upsert(job: Job) -> Job:
+        _jobs.put(job)
+        return job
+
+    @staticmethod
+    def unfinished() -> List[Job]:
+        """Jobs left queued or running, e.g. by a previous process that stopped mid-job."""
+        return _jobs.unfinished()
@@ -0,0 +1,108 @@
+"""Logging setup: leveled loggers under ``app.*``, text or JSON lines, and a request id on every record.
+
+Records are handed to a QueueHandler, and a QueueListener thread formats and
+writes them, so a request never blocks on stdout. Call ``get_logger("store")``
+in a module and log with %-style arguments; debug records cost one level check
+when DEBUG is off.
+"""
+from __future__ import annotations
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from .config import settings
+
+# Set per request by RequestIdMiddleware; tasks spawned while handling a request inherit it
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render any traceback here, but leave layout to the writer thread's formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, requestId, msg, and exc when there is a traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "requestId": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup() -> None:
+    """Route ``app.*`` loggers through a queue to stdout. Safe to call more than once."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    if settings.log_format.lower() == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(name)s] [%(request_id)s] %(message)s"))
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    # The filter runs on the calling thread, where the request's context is visible
+    handler.addFilter(_RequestIdFilter())
+    root = logging.getLogger("app")
+    root.setLevel(settings.log_level.upper())
+    if _handler is not None:
+        root.removeHandler(_handler)
+    _handler = handler
+    root.addHandler(handler)
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(records, stream)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Detach the queue handler, then flush queued records and stop the writer thread.
+
+    Records logged afterwards (e.g. during lifespan teardown) propagate to the
+    root logger as if setup() had never run, instead of sitting in a queue
+    nobody drains; the next setup() attaches a fresh handler.
+    """
+    global _listener, _handler
+    root = logging.getLogger("app")
+    if _handler is not None:
+        root.removeHandler(_handler)
+        _handler = None
+    root.propagate = True
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    setup()
+    return logging.getLogger(f"app.{name}")
@@ -1,11 +1,21 @@
 from __future__ import annotations
+import time
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .middlewares import ApiKeyMiddleware
+from . import IMPORT_STARTED, log, metrics
+from .responses import FastJSONResponse
+from .middlewares import ApiKeyMiddleware, RequestIdMiddleware, TimingMiddleware
+from .db.store import PostsStore
+from .services import agent, background, http, jobs, resilience, scheduler, warmup, workers
+from .services.research_cache import research_cache
+from .services.single_flight import prompt_cache
 from .routers.posts import router as posts_router
 from .routers.auth import router as auth_router
+from .routers.jobs import router as jobs_router
+from .routers.images import router as images_router
 
-app = FastAPI(title="LinkedIn Post Generator API (Python)")
+app = FastAPI(title="LinkedIn Post Generator API (Python)", default_response_class=FastJSONResponse)
 
 # CORS: allow all origins by default (dev)
 app.add_middleware(
@@ -14,15 +24,134 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Location", "X-Request-ID", "Server-Timing"],
 )
 
 # API key auth (no-op if API_KEY not set)
 app.add_middleware(ApiKeyMiddleware)
 
+# Route histograms and the Server-Timing header
+app.add_middleware(TimingMiddleware)
+
+# Added last so it wraps everything else: every log line for a request, including auth rejections, carries its id
+app.add_middleware(RequestIdMiddleware)
+
+@app.on_event("startup")
+def _start_logging() -> None:
+    log.setup()
+
+
+@app.on_event("startup")
+async def _start_heartbeat() -> None:
+    # Before anything claims work: siblings only recover claims whose owner stopped heartbeating
+    workers.start()
+
+
+@app.on_event("startup")
+async def _warm_up() -> None:
+    # Store load (then idea index and scheduler), agent compile and provider connections, in the background
+    warmup.start()
+
+
+@app.on_event("startup")
+async def _start_jobs() -> None:
+    jobs.start()
+
+
+@app.on_event("shutdown")
+async def _stop_warm_up() -> None:
+    await warmup.stop()
+
+
+@app.on_event("shutdown")
+async def _stop_scheduler() -> None:
+    await scheduler.stop()
+
+
+@app.on_event("shutdown")
+async def _stop_jobs() -> None:
+    await jobs.stop()
+
+
+@app.on_event("shutdown")
+async def _stop_heartbeat() -> None:
+    # After the scheduler and jobs: whatever they left unfinished is now up for recovery by siblings
+    await workers.stop()
+
+
+@app.on_event("shutdown")
+async def _drain_background() -> None:
+    # Let in-flight image stages land before the store is compacted
+    await background.drain(timeout=30)
+
+
+@app.on_event("shutdown")
+def _compact_store() -> None:
+    PostsStore.compact()
+
+
+@app.on_event("shutdown")
+async def _close_http_pools() -> None:
+    await http.aclose_all()
+
+
+@app.on_event("shutdown")
+def _stop_logging() -> None:
+    log.shutdown()
+
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "agent": agent.agent_stats(),
+        "researchCache": research_cache.stats(),
+        "promptCache": prompt_cache.stats(),
+        "providers": resilience.snapshot(),
+    }
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until the startup warm-up has finished, so no traffic reaches a cold process."""
+    body = warmup.status()
+    return FastJSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _service_metrics():
+    agent_stats = agent.agent_stats()
+    yield "app_agent_builds_total", "ReAct agents compiled.", "counter", [({}, agent_stats["builds"])]
+    yield "app_agent_build_seconds_total", "Time spent compiling ReAct agents.", "counter", [({}, agent_stats["build_ms"] / 1000)]
+    yield "app_agent_cache_lookups_total", "Compiled-agent cache lookups.", "counter", [
+        ({"result": "hit"}, agent_stats["hits"]),
+        ({"result": "miss"}, agent_stats["misses"]),
+    ]
+    for cache_name, stats in (("research", research_cache.stats()), ("prompt", prompt_cache.stats())):
+        yield f"app_{cache_name}_cache", f"{cache_name.capitalize()} cache counters and size.", "gauge", [
+            ({"stat": key}, value) for key, value in stats.items()
+        ]
+    providers = resilience.snapshot()
+    yield "app_provider_breaker_open", "1 while the provider's circuit breaker is open.", "gauge", [
+        ({"provider": name}, 1 if p["breaker"] == "open" else 0) for name, p in providers.items()
+    ]
+    yield "app_provider_rejected_total", "Calls refused by the breaker or rate limiter.", "counter", [
+        ({"provider": name}, p["rejected"]) for name, p in providers.items()
+    ]
+    yield "app_posts", "Stored posts by status.", "gauge", [
+        ({"status": status}, n) for status, n in PostsStore.stats()["byStatus"].items()
+    ]
+
+
+metrics.register_collector(_service_metrics)
 
 # Routers
 app.include_router(posts_router)
 app.include_router(auth_router)
+app.include_router(jobs_router)
+app.include_router(images_router)
+
+warmup.record_import("app", time.perf_counter() - IMPORT_STARTED)
@@ -0,0 +1,183 @@
+"""In-process timing metrics: spans, fixed-bucket histograms and Prometheus text output.
+
+Wrap an operation in ``span("store.get")`` (or decorate it with ``timed``) to
+record its duration in ``app_span_duration_seconds``. While a request is being
+handled, TimingMiddleware also collects its spans for the ``Server-Timing``
+header, so the browser's devtools show where the time went.
+"""
+from __future__ import annotations
+import asyncio
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Upper bounds in seconds: store operations land in the first few, model calls in the last few
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# name -> [total seconds, count] for the request being handled; set by TimingMiddleware
+_request_spans: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a fixed tuple of label values. Safe to observe from any thread."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values: str) -> None:
+        # Per series: one count per bucket plus +Inf, then the sum
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += seconds
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key in sorted(series):
+            values = series[key]
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labels, key))
+            sep = "," if labels else ""
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (math.inf,), values[:-1]):
+                cumulative += n
+                le = "+Inf" if bound == math.inf else repr(bound)
+                yield f'{self.name}_bucket{{{labels}{sep}le="{le}"}} {cumulative:.0f}'
+            yield f"{self.name}_sum{{{labels}}} {values[-1]!r}"
+            yield f"{self.name}_count{{{labels}}} {cumulative:.0f}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+SPANS = Histogram("app_span_duration_seconds", "Time spent in instrumented operations.", ("span",))
+ROUTES = Histogram("app_http_request_duration_seconds", "HTTP request handling time by route.", ("method", "route", "status"))
+PROVIDERS = Histogram(
+    "app_provider_request_duration_seconds",
+    "Outbound provider call time, including the wait for a concurrency slot.",
+    ("provider", "outcome"),
+)
+
+
+class Span:
+    __slots__ = ("name", "seconds")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.seconds = 0.0
+
+
+def record(name: str, seconds: float) -> None:
+    SPANS.observe(seconds, name)
+    _add_to_request(name, seconds)
+
+
+def record_provider(provider: str, outcome: str, seconds: float) -> None:
+    """One outbound call: ``outcome`` is the status class ("2xx", "4xx", "5xx"), "429", "error" or "rejected"."""
+    PROVIDERS.observe(seconds, provider, outcome)
+    _add_to_request(f"provider.{provider}", seconds)
+
+
+def _add_to_request(name: str, seconds: float) -> None:
+    spans = _request_spans.get()
+    if spans is not None:
+        entry = spans.get(name)
+        if entry is None:
+            spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+@contextmanager
+def span(name: str) -> Iterator[Span]:
+    """Time the block as ``name``; the yielded Span's ``seconds`` is filled in when it exits."""
+    s = Span(name)
+    started = time.perf_counter()
+    try:
+        yield s
+    finally:
+        s.seconds = time.perf_counter() - started
+        record(name, s.seconds)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator form of span() for plain and async functions."""
+    def decorate(fn: F) -> F:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return run_async  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def run(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+        return run  # type: ignore[return-value]
+    return decorate
+
+
+def start_request() -> Tuple[Dict[str, List[float]], Any]:
+    """Begin collecting spans for Server-Timing. Returns the collector and a token for end_request()."""
+    spans: Dict[str, List[float]] = {}
+    return spans, _request_spans.set(spans)
+
+
+def end_request(token: Any) -> None:
+    _request_spans.reset(token)
+
+
+def server_timing(spans: Dict[str, List[float]], total: float) -> str:
+    """Format collected spans as a Server-Timing header value (durations in milliseconds)."""
+    parts = []
+    for name, (seconds, count) in list(spans.items()):
+        desc = f';desc="x{count:.0f}"' if count > 1 else ""
+        parts.append(f"{name};dur={seconds * 1000:.2f}{desc}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# Extra samples for /metrics, e.g. cache counters: each returns (name, help, type, [(labels, value), ...])
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+_collectors: List[Collector] = []
+
+
+def register_collector(collector: Collector) -> None:
+    _collectors.append(collector)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for histogram in (ROUTES, PROVIDERS, SPANS):
+        lines.extend(histogram.render())
+    for collector in _collectors:
+        for name, help, kind, samples in collector():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {float(value)!r}" if label_text else f"{name} {float(value)!r}")
+    return "\n".join(lines) + "\n"
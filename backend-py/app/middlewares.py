@@ -1,8 +1,15 @@
 from __future__ import annotations
+import re
+import time
+import uuid
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from .config import settings
+from . import log, metrics
+
+# Caller-supplied ids are echoed into logs and headers, so keep them short and printable
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
 
 
 class ApiKeyMiddleware(BaseHTTPMiddleware):
@@ -10,6 +17,12 @@ class ApiKeyMiddleware(BaseHTTPMiddleware):
         # If API key not set, allow all (dev mode)
         if not settings.api_key:
             return await call_next(request)
+        # Stored images are loaded by <img> tags, which cannot send the key; ids are unguessable content hashes
+        if request.method in ("GET", "HEAD") and request.url.path.startswith("/images/"):
+            return await call_next(request)
+        # Load balancers and orchestrators probe readiness without credentials; it only reports warm-up state
+        if request.method == "GET" and request.url.path == "/ready":
+            return await call_next(request)
 
         key = request.headers.get("x-api-key")
         if not key:
@@ -21,3 +34,37 @@ class ApiKeyMiddleware(BaseHTTPMiddleware):
             return JSONResponse({"error": "Unauthorized"}, status_code=401)
 
         return await call_next(request)
+
+
+class RequestIdMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        # Reuse the caller's X-Request-ID (e.g. from a proxy) so logs line up across services
+        rid = request.headers.get("x-request-id", "")
+        if not _REQUEST_ID_RE.match(rid):
+            rid = uuid.uuid4().hex[:16]
+        token = log.request_id.set(rid)
+        try:
+            response = await call_next(request)
+        finally:
+            log.request_id.reset(token)
+        response.headers["X-Request-ID"] = rid
+        return response
+
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        spans, token = metrics.start_request()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.end_request(token)
+            # The route template, not the raw path, so post ids do not each become a series
+            route = request.scope.get("route")
+            metrics.ROUTES.observe(elapsed, request.method, getattr(route, "path", "unmatched"), str(status))
+        # For streamed responses this covers the work done before the first byte
+        response.headers["Server-Timing"] = metrics.server_timing(spans, elapsed)
+        return response
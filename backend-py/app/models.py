@@ -1,9 +1,23 @@
 from __future__ import annotations
-from typing import Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 PostStatus = Literal['draft', 'validated', 'posted', 'deleted']
+ImageStatus = Literal['pending', 'ready', 'failed']
+
+# Content buckets; an idea belongs to the bucket whose name it starts with
+BUCKETS = ["Timeless principle", "Case study", "Growth hack", "Controversial topic"]
+
+
+def bucket_of(idea: Optional[str]) -> Optional[str]:
+    """The content bucket an idea starts with, or None."""
+    s = (idea or "").strip().lower()
+    for b in BUCKETS:
+        bl = b.lower()
+        if s.startswith(bl) or s.startswith(bl.replace(" ", "")):
+            return b
+    return None
 
 
 class Post(BaseModel):
@@ -14,6 +28,7 @@ class Post(BaseModel):
     text: str
     imageUrl: str
     imagePrompt: Optional[str] = None
+    imageStatus: Optional[ImageStatus] = None
     status: PostStatus
     createdAt: datetime
     updatedAt: datetime
@@ -21,13 +36,77 @@ class Post(BaseModel):
     postedAt: Optional[datetime] = None
     deletedAt: Optional[datetime] = None
     linkedinPostUrl: Optional[str] = None
+    # When the scheduler should publish the post (UTC)
+    scheduledAt: Optional[datetime] = None
+    # Set before a publish attempt starts; a post that has one but never reached 'posted' is not published again
+    publishKey: Optional[str] = None
+    # Worker process holding the publishKey claim; see services/workers.py
+    publishOwner: Optional[str] = None
+    publishError: Optional[str] = None
+    # Encoded JSON of this instance, filled by json_bytes() and dropped whenever a field is assigned
+    _json: Optional[bytes] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in Post.model_fields:
+            self._json = None
+        super().__setattr__(name, value)
+
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False) -> "Post":
+        copy = super().model_copy(update=update, deep=deep)
+        copy._json = None
+        return copy
+
+    def json_bytes(self) -> bytes:
+        """The post as JSON (same shape as the API returns), encoded once per instance.
+
+        The store replaces posts instead of mutating them, so a stored post is encoded
+        at most once however often it is listed or journaled.
+        """
+        # Straight to the private-attribute dict: this runs once per post in every list response
+        private = self.__pydantic_private__
+        data = private["_json"]
+        if data is None:
+            data = private["_json"] = self.__pydantic_serializer__.to_json(self)
+        return data
 
 
 class GenerateRequest(BaseModel):
     topic: Optional[str] = None
 
 
+class BatchGenerateRequest(BaseModel):
+    count: int = Field(..., ge=1, le=50)
+    # Assigned round-robin across the drafts
+    topics: Optional[List[str]] = None
+
+
 class PostUpdate(BaseModel):
     title: Optional[str] = None
     text: Optional[str] = None
     imageUrl: Optional[str] = None
+
+
+class ScheduleRequest(BaseModel):
+    # None cancels the schedule
+    scheduledAt: Optional[datetime] = None
+
+
+JobStatus = Literal['queued', 'running', 'succeeded', 'failed']
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    postId: Optional[str] = None
+    status: JobStatus
+    # Last progress step reported by the running operation, e.g. "generating text"
+    stage: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[Post] = None
+    # Worker process that accepted and runs the job; see services/workers.py
+    owner: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
@@ -0,0 +1,34 @@
+from __future__ import annotations
+from typing import Any, Iterable, Mapping, Optional
+from fastapi.responses import JSONResponse, Response
+from .models import Post
+
+try:
+    import orjson  # Optional: pip install orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: encodes with orjson when it is installed, else like JSONResponse."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def post_response(post: Post, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Send a post's cached encoding as is, skipping response-model validation and re-encoding."""
+    return Response(post.json_bytes(), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def posts_response(posts: Iterable[Post], status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """A JSON array spliced together from each post's cached encoding."""
+    parts = [p.json_bytes() for p in posts]
+    if not parts:
+        return Response(b"[]", status_code=status_code, headers=headers, media_type="application/json")
+    # Brackets go on the end fragments so the (possibly large) body is copied once, by join
+    parts[0] = b"[" + parts[0]
+    parts[-1] = parts[-1] + b"]"
+    return Response(b",".join(parts), status_code=status_code, headers=headers, media_type="application/json")
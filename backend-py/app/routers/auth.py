@@ -1,9 +1,10 @@
 from __future__ import annotations
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
-import requests
+from fastapi.concurrency import run_in_threadpool
 from ..config import settings
 from ..db.store import AuthStore
+from ..services import http
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -27,7 +28,7 @@ def linkedin_start():
         raise HTTPException(status_code=400, detail="Missing LINKEDIN_CLIENT_ID or LINKEDIN_REDIRECT_URI")
     from urllib.parse import urlencode
 
-    url = "https://www.linkedin.com/oauth/v2/authorization?" + urlencode({
+    url = f"{settings.linkedin.oauth_base_url}/oauth/v2/authorization?" + urlencode({
         "response_type": "code",
         "client_id": client_id,
         "redirect_uri": redirect_uri,
@@ -38,7 +39,7 @@ def linkedin_start():
 
 
 @router.get("/linkedin/callback")
-def linkedin_callback(code: Optional[str] = Query(default=None)):
+async def linkedin_callback(code: Optional[str] = Query(default=None)):
     if not code:
         raise HTTPException(status_code=400, detail="Missing code")
 
@@ -57,8 +58,10 @@ def linkedin_callback(code: Optional[str] = Query(default=None)):
     }
 
     try:
-        resp = requests.post(
-            "https://www.linkedin.com/oauth/v2/accessToken",
+        resp = await http.request(
+            "linkedin",
+            "POST",
+            f"{settings.linkedin.oauth_base_url}/oauth/v2/accessToken",
             data=data,
             headers={"content-type": "application/x-www-form-urlencoded"},
             timeout=15,
@@ -72,8 +75,10 @@ def linkedin_callback(code: Optional[str] = Query(default=None)):
 
         author_urn = None
         try:
-            me = requests.get(
-                "https://api.linkedin.com/v2/me",
+            me = await http.request(
+                "linkedin",
+                "GET",
+                f"{settings.providers.linkedin.base_url}/v2/me",
                 headers={"Authorization": f"Bearer {access_token}"},
                 timeout=10,
             )
@@ -87,7 +92,8 @@ def linkedin_callback(code: Optional[str] = Query(default=None)):
         from datetime import datetime, timedelta
         expires_at = (datetime.utcnow() + timedelta(seconds=int(expires_in or 0))).isoformat() + "Z" if expires_in else None
 
-        AuthStore.set_linkedin({
+        # The write takes auth.lock and fsyncs; keep it off the event loop
+        await run_in_threadpool(AuthStore.set_linkedin, {
             "accessToken": access_token,
             "expiresAt": expires_at,
             "authorUrn": author_urn,
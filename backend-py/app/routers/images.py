@@ -0,0 +1,19 @@
+from __future__ import annotations
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from ..services.image_store import content_type, image_path
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+
+@router.get("/{image_id}")
+def get_image(image_id: str, request: Request) -> Response:
+    path = image_path(image_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    # Ids are content hashes, so the id is a strong ETag and the bytes never change
+    etag = f'"{image_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=content_type(path), headers=headers)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+from typing import AsyncIterator
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from ..db.store import JobsStore
+from ..models import Job
+from ..services import jobs
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str) -> Job:
+    job = JobsStore.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Not found")
+    return job
+
+
+@router.get("/{job_id}/events")
+def job_events(job_id: str) -> StreamingResponse:
+    """Server-sent events: one ``job`` event per state change, ending when the job finishes."""
+    if not JobsStore.get(job_id):
+        raise HTTPException(status_code=404, detail="Not found")
+
+    async def stream() -> AsyncIterator[str]:
+        async for job in jobs.watch(job_id):
+            yield f"event: job\ndata: {job.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,142 +1,518 @@
 from __future__ import annotations
-from typing import Optional
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Query, Body, status
-from ..models import Post, GenerateRequest, PostUpdate, PostStatus
-from ..db.store import PostsStore
+from fastapi import APIRouter, HTTPException, Query, Body, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from ..config import settings
+from ..models import BUCKETS, BatchGenerateRequest, Job, Post, GenerateRequest, PostUpdate, PostStatus, ScheduleRequest
+from ..db.store import PostsStore, sort_value
+from ..responses import FastJSONResponse, post_response, posts_response
 from ..services.id import new_id
-from ..services.agent import generate_post_idea_react
-from ..services.llm import regenerate_text as llm_regenerate_text
+from ..services.agent import generate_post_idea_react, least_used_bucket
+from ..services import jobs, scheduler
+from ..services.background import spawn
+from ..services.jobs import Reporter
+from ..services.llm import regenerate_text as llm_regenerate_text, stream_post_idea, stream_regenerated_text
 from ..services.images import generate_image
-from ..services.linkedin import publish_to_linkedin
+from ..services.research import research_brief
+from ..services.similarity import idea_index, idea_text, signature, similarity
+from ..log import get_logger
+
+log = get_logger("posts")
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+BATCH_DUPLICATE_RETRIES = 2
+
+
+def _no_report(stage: str) -> None:
+    pass
 
-@router.get("/")
-def list_posts(status: Optional[PostStatus] = Query(default=None)) -> list[Post]:
-    return PostsStore.get_all(status)
 
+def _respond_async(request: Request) -> bool:
+    """True if the client asked for a background job (RFC 7240 ``Prefer: respond-async``)."""
+    return "respond-async" in request.headers.get("prefer", "").lower()
+
+
+def _accepted(job: Job) -> JSONResponse:
+    return JSONResponse(
+        job.model_dump(mode="json"),
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"/jobs/{job.id}", "Preference-Applied": "respond-async"},
+    )
 
-@router.get("/{post_id}")
-def get_post(post_id: str) -> Post:
+
+def _require(post_id: str) -> Post:
     p = PostsStore.get_by_id(post_id)
     if not p:
         raise HTTPException(status_code=404, detail="Not found")
     return p
 
 
-@router.post("/generate", status_code=status.HTTP_201_CREATED)
-def generate_post(payload: Optional[GenerateRequest] = Body(default=None)) -> Post:
-    print("[POSTS] /posts/generate called")
-    existing = PostsStore.get_all()
-    print(f"[POSTS] Loaded existing posts: count={len(existing)}")
-    existing_ideas = [p.idea or "" for p in existing if p.idea]
-    print(f"[POSTS] Extracted existing ideas: count={len(existing_ideas)}")
+@router.get("/", response_model=List[Post])
+def list_posts(
+    status: Optional[PostStatus] = Query(default=None),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None, description="Comma-separated Post fields to return; id is always included"),
+    sort: Optional[Literal["createdAt", "updatedAt"]] = Query(default=None),
+    order: Literal["asc", "desc"] = Query(default="desc"),
+) -> Response:
+    include = None
+    if fields:
+        include = {f.strip() for f in fields.split(",") if f.strip()} | {"id"}
+        unknown = include - set(Post.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    headers = {}
+    if limit is None and cursor is None and sort is None:
+        # Unpaginated listing keeps the store's newest-first order
+        items = PostsStore.get_all(status)
+    else:
+        try:
+            items, next_cursor = PostsStore.get_page(
+                status=status,
+                sort=sort or "createdAt",
+                order=order,
+                limit=limit or DEFAULT_PAGE_SIZE,
+                cursor=cursor,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+    if include is not None:
+        return FastJSONResponse([p.model_dump(mode="json", include=include) for p in items], headers=headers)
+    return posts_response(items, headers=headers)
+
+
+@router.get("/stats")
+def post_stats() -> Dict[str, Any]:
+    """Post counts by status and content bucket, from counters the store keeps current on every write."""
+    return PostsStore.stats()
 
-    topic = payload.topic if payload else None
-    print(f"[POSTS] Topic from payload: {topic!r}")
-    # Use ReAct agent (LangChain + Anthropic + Perplexity tool). Falls back automatically if unavailable.
-    print("[POSTS] Generating post idea via agent...")
-    idea = generate_post_idea_react(existing_ideas=existing_ideas, topic=topic)
-    print(f"[POSTS] Idea generated with keys: {list(idea.keys())}")
 
-    print("[POSTS] Generating image from prompt...")
-    image_url = generate_image(idea["image"])
-    print(f"[POSTS] Image generated: url={image_url}")
+@router.get("/{post_id}", response_model=Post)
+def get_post(post_id: str) -> Response:
+    p = PostsStore.get_by_id(post_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Not found")
+    return post_response(p)
+
+
+async def _attach_image(post_id: str, description: str) -> None:
+    """Background image stage for a saved draft: generate the image and patch it onto the post."""
+    # Both writes are conditional: an image set or regenerated by hand while this was running wins
+    try:
+        image_url = await generate_image(description)
+    except Exception:
+        await run_in_threadpool(PostsStore.update_fields, post_id, {"imageStatus": "failed"}, expect={"imageStatus": "pending"})
+        raise
+    attached = await run_in_threadpool(
+        PostsStore.update_fields, post_id, {"imageUrl": image_url, "imageStatus": "ready"}, expect={"imageStatus": "pending"}
+    )
+    if attached is None:
+        log.info("Image for id=%s no longer pending; discarding generated url", post_id)
+        return
+    log.info("Image attached to id=%s url=%s", post_id, image_url)
 
+
+def _new_draft(idea: Dict[str, str]) -> Post:
     now = datetime.utcnow()
-    print("[POSTS] Constructing Post draft object...")
-    draft = Post(
+    return Post(
         id=new_id(),
         name=idea.get("name") or "",
         idea=idea.get("idea") or "",
         title=idea.get("title") or "Untitled",
         text=idea.get("text") or "...",
-        imageUrl=image_url,
+        imageUrl="",
         imagePrompt=idea.get("image") or None,
+        imageStatus="pending",
         status="draft",
         createdAt=now,
         updatedAt=now,
     )
 
-    print(f"[POSTS] Saving draft post id={draft.id} to store...")
-    PostsStore.upsert(draft)
-    print(f"[POSTS] Draft saved. Returning response for id={draft.id}")
+
+def _queue_image(draft: Post) -> None:
+    spawn(
+        _attach_image(draft.id, draft.imagePrompt or f"{draft.title} minimal illustration, flat design"),
+        name=f"image:{draft.id}",
+    )
+
+
+def _duplicate_of(idea: Dict[str, str]) -> Optional[str]:
+    """Id of a stored post whose idea/title is a near-duplicate of ``idea``, if any."""
+    hits = idea_index.near_duplicates(idea_text(idea.get("idea"), idea.get("title")))
+    if hits:
+        log.info("Generated idea duplicates post id=%s similarity=%.2f", hits[0][0], hits[0][1])
+        return hits[0][0]
+    return None
+
+
+async def _fresh_idea(
+    *,
+    topic: Optional[str],
+    research: Optional[Awaitable[str]],
+    bucket: str,
+    avoid: Optional[List[str]] = None,
+    report: Reporter = _no_report,
+    generate: Optional[Callable[[List[str]], Awaitable[Dict[str, str]]]] = None,
+) -> Dict[str, str]:
+    """Generate an idea in ``bucket`` that is not a near-duplicate of a stored post.
+
+    The prompt lists only the stored ideas most related to the topic (or bucket) plus ``avoid``, instead of
+    every idea. A duplicate is regenerated with the rejected idea added to the list, up to IDEA_DUP_RETRIES
+    times, and each retry is announced through ``report``; after that the last attempt is returned as is.
+    ``generate`` replaces the ReAct agent for one attempt (it receives the ideas to avoid), e.g. to stream tokens.
+    """
+    if generate is None:
+        async def generate(used: List[str]) -> Dict[str, str]:
+            return await generate_post_idea_react(existing_ideas=used, topic=topic, research=research, bucket=bucket)
+
+    rejected: List[str] = []
+    idea: Dict[str, str] = {}
+    for attempt in range(settings.idea_dup_retries + 1):
+        if attempt:
+            report("regenerating duplicate idea")
+        # Rejected and in-flight ideas go first: the direct generator keeps only the head of the list
+        used = rejected + (avoid or []) + idea_index.prompt_ideas(topic or bucket)
+        idea = await generate(used)
+        if _duplicate_of(idea) is None:
+            break
+        rejected.append(idea.get("idea") or idea.get("title") or "")
+    return idea
+
+
+@jobs.register("generate")
+async def _generate(params: Dict[str, Any], report: Reporter = _no_report) -> Post:
+    """Generate and save a draft. Returns as soon as the text exists; the image is attached in the background
+    (``imageStatus`` goes from ``pending`` to ``ready``)."""
+    topic = params.get("topic")
+    # Start research for a supplied topic now so it overlaps with loading ideas and building the prompt
+    research = asyncio.create_task(research_brief(topic)) if topic else None
+
+    bucket, counts = least_used_bucket()
+    log.debug("Selected bucket %s from counts=%s topic=%r", bucket, counts, topic)
+
+    # Use ReAct agent (LangChain + Anthropic + Perplexity tool). Falls back automatically if unavailable.
+    report("generating text")
+    idea = await _fresh_idea(topic=topic, research=research, bucket=bucket, report=report)
+    log.debug("Idea generated with keys: %s", list(idea))
+
+    draft = _new_draft(idea)
+    await run_in_threadpool(PostsStore.upsert, draft)
+    _queue_image(draft)
+    report("image queued")
+    log.info("Draft saved, image queued id=%s", draft.id)
     return draft
 
 
-@router.put("/{post_id}")
-def update_post(post_id: str, patch: PostUpdate) -> Post:
-    updated = PostsStore.update_fields(post_id, patch.model_dump(exclude_none=True))
+@router.post("/generate", status_code=status.HTTP_201_CREATED, response_model=Post)
+async def generate_post(request: Request, payload: Optional[GenerateRequest] = Body(default=None)) -> Response:
+    params = {"topic": payload.topic if payload else None}
+    if _respond_async(request):
+        return _accepted(await jobs.submit("generate", params))
+    return post_response(await _generate(params), status.HTTP_201_CREATED)
+
+
+def _sse(event: str, data: Any) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/generate/stream")
+async def generate_post_stream(topic: Optional[str] = Query(default=None)) -> StreamingResponse:
+    """Server-sent events version of POST /posts/generate.
+
+    Events: ``research_started``/``research_done`` (when a topic is given), ``token`` per text delta,
+    ``reset`` if the model call failed mid-stream and the fallback restarts the text or the finished idea
+    duplicated a stored post and is being regenerated, ``draft_saved`` with the Post, ``image_queued``, then
+    ``done``. Uses the direct generator, which can stream tokens; the
+    ReAct agent cannot.
+    """
+    async def events() -> AsyncIterator[str]:
+        research = asyncio.create_task(research_brief(topic)) if topic else None
+        if research is not None:
+            yield _sse("research_started", {"topic": topic})
+        bucket, _counts = least_used_bucket()
+        brief = ""
+        if research is not None:
+            brief = await research
+            yield _sse("research_done", {"length": len(brief)})
+
+        # Attempts run as a task that feeds this queue; None marks the end
+        queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+        async def attempt(used: List[str]) -> Dict[str, str]:
+            idea: Optional[Dict[str, str]] = None
+            async for kind, value in stream_post_idea(
+                existing_ideas=used,
+                topic=topic,
+                research_snippets=[brief] if brief else [],
+                bucket=bucket,
+            ):
+                if kind == "token":
+                    queue.put_nowait(_sse("token", {"text": value}))
+                elif kind == "reset":
+                    queue.put_nowait(_sse("reset", {}))
+                else:
+                    idea = value
+            assert idea is not None
+            return idea
+
+        task = asyncio.create_task(_fresh_idea(
+            topic=topic,
+            research=None,
+            bucket=bucket,
+            # A duplicate restarts the text, like a failed model call does
+            report=lambda stage: queue.put_nowait(_sse("reset", {})),
+            generate=attempt,
+        ))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            # The client went away mid-stream: stop generating
+            task.cancel()
+        idea = task.result()
+
+        draft = _new_draft(idea)
+        await run_in_threadpool(PostsStore.upsert, draft)
+        yield _sse("draft_saved", draft.json_bytes().decode())
+        _queue_image(draft)
+        yield _sse("image_queued", {"postId": draft.id})
+        yield _sse("done", {})
+
+    return _event_stream(events())
+
+
+@router.post("/generate/batch", status_code=status.HTTP_201_CREATED, response_model=List[Post])
+async def generate_batch(payload: BatchGenerateRequest) -> Response:
+    """Generate ``count`` drafts concurrently (at most BATCH_CONCURRENCY at a time), spread across the content
+    buckets, and save them in one store transaction. Each draft avoids near-duplicates of stored posts (see
+    ``_fresh_idea``); drafts that are near-duplicates of another draft in the batch are regenerated, and any
+    still duplicated after the retries are dropped."""
+    log.info("Batch generate count=%d topics=%r", payload.count, payload.topics)
+    topics = [t for t in (payload.topics or []) if t and t.strip()]
+    # Plan buckets up front: each draft takes the least-used bucket, counting the drafts planned before it
+    counts = PostsStore.bucket_counts()
+    plan = []
+    for i in range(payload.count):
+        bucket = min(BUCKETS, key=lambda b: counts[b])
+        counts[bucket] += 1
+        plan.append((bucket, topics[i % len(topics)] if topics else None))
+
+    # One research lookup per distinct topic, shared by every draft on that topic
+    research = {t: asyncio.create_task(research_brief(t)) for t in set(topics)}
+    limit = asyncio.Semaphore(max(1, settings.batch_concurrency))
+    batch_ideas: list[str] = []
+
+    async def one(bucket: str, topic: Optional[str]) -> Dict[str, str]:
+        async with limit:
+            # Ideas finished earlier in this batch count as already used ([-0:] would be all of them)
+            k = settings.idea_prompt_top_k
+            idea = await _fresh_idea(
+                topic=topic,
+                research=research.get(topic) if topic else None,
+                bucket=bucket,
+                avoid=batch_ideas[-k:] if k > 0 else [],
+            )
+        batch_ideas.append(idea.get("idea") or "")
+        return idea
+
+    ideas: list[Optional[Dict[str, str]]] = list(await asyncio.gather(*(one(b, t) for b, t in plan)))
+    for attempt in range(BATCH_DUPLICATE_RETRIES + 1):
+        seen = []  # signatures of the drafts kept so far
+        dupes = []
+        for i, idea in enumerate(ideas):
+            sig = signature(idea_text((idea or {}).get("idea"), (idea or {}).get("title")))
+            if any(similarity(sig, other) >= settings.idea_dup_threshold for other in seen):
+                dupes.append(i)
+            else:
+                seen.append(sig)
+        if not dupes:
+            break
+        if attempt == BATCH_DUPLICATE_RETRIES:
+            log.warning("Dropping %d drafts still duplicated after retries", len(dupes))
+            for i in dupes:
+                ideas[i] = None
+            break
+        log.info("Regenerating %d duplicate drafts", len(dupes))
+        retried = await asyncio.gather(*(one(*plan[i]) for i in dupes))
+        for i, idea in zip(dupes, retried):
+            ideas[i] = idea
+
+    drafts = [_new_draft(idea) for idea in ideas if idea is not None]
+    await run_in_threadpool(PostsStore.upsert_many, drafts)
+    for draft in drafts:
+        _queue_image(draft)
+    log.info("Batch saved count=%d", len(drafts))
+    return posts_response(drafts, status.HTTP_201_CREATED)
+
+
+@router.put("/{post_id}", response_model=Post)
+def update_post(post_id: str, patch: PostUpdate) -> Response:
+    fields = patch.model_dump(exclude_none=True)
+    if "imageUrl" in fields:
+        fields["imageStatus"] = "ready"
+    updated = PostsStore.update_fields(post_id, fields)
     if not updated:
         raise HTTPException(status_code=404, detail="Not found")
-    return updated
+    return post_response(updated)
 
 
-@router.post("/{post_id}/validate")
-def validate_post(post_id: str) -> Post:
+@router.post("/{post_id}/validate", response_model=Post)
+def validate_post(post_id: str) -> Response:
     p = PostsStore.get_by_id(post_id)
     if not p:
         raise HTTPException(status_code=404, detail="Not found")
+    if p.status != "draft":
+        # Re-validating a posted post would make it publishable again while it still holds its publishKey
+        raise HTTPException(status_code=409, detail=f"Only drafts can be validated; post is {p.status}")
+    if p.imageStatus == "pending":
+        # A fresh draft's image is still being generated; the client should retry once it is ready
+        raise HTTPException(status_code=409, detail="Image still pending; retry once imageStatus is ready")
     if not (p.title and p.title.strip() and p.text and p.text.strip() and p.imageUrl and p.imageUrl.strip()):
         raise HTTPException(status_code=400, detail="Missing required fields to validate")
     now = datetime.utcnow()
-    updated = PostsStore.update_fields(post_id, {"status": "validated", "validatedAt": now, "updatedAt": now})
-    assert updated
-    return updated
+    updated = PostsStore.update_fields(post_id, {"status": "validated", "validatedAt": now, "updatedAt": now}, expect={"status": "draft"})
+    if updated is None:
+        raise HTTPException(status_code=409, detail="Post changed while validating; reload it and retry")
+    return post_response(updated)
 
 
-@router.post("/{post_id}/delete")
-def delete_post(post_id: str) -> Post:
+@router.post("/{post_id}/delete", response_model=Post)
+def delete_post(post_id: str) -> Response:
     p = PostsStore.get_by_id(post_id)
     if not p:
         raise HTTPException(status_code=404, detail="Not found")
     now = datetime.utcnow()
     updated = PostsStore.update_fields(post_id, {"status": "deleted", "deletedAt": now, "updatedAt": now})
     assert updated
-    return updated
+    return post_response(updated)
 
 
-@router.post("/{post_id}/regenerate-image")
-def regenerate_image(post_id: str) -> Post:
-    p = PostsStore.get_by_id(post_id)
-    if not p:
-        raise HTTPException(status_code=404, detail="Not found")
+@jobs.register("regenerate-image")
+async def _regenerate_image(params: Dict[str, Any], report: Reporter = _no_report) -> Post:
+    p = _require(params["postId"])
     desc = p.imagePrompt or f"{p.title} minimal illustration, flat design"
-    url = generate_image(desc)
-    updated = PostsStore.update_fields(post_id, {"imageUrl": url, "updatedAt": datetime.utcnow()})
+    report("generating image")
+    url = await generate_image(desc)
+    updated = await run_in_threadpool(
+        PostsStore.update_fields, p.id, {"imageUrl": url, "imageStatus": "ready", "updatedAt": datetime.utcnow()}
+    )
     assert updated
     return updated
 
 
-@router.post("/{post_id}/regenerate-text")
-def regenerate_text(post_id: str) -> Post:
-    p = PostsStore.get_by_id(post_id)
-    if not p:
-        raise HTTPException(status_code=404, detail="Not found")
-    new_text = llm_regenerate_text(p.title, p.text)
-    updated = PostsStore.update_fields(post_id, {"text": new_text, "updatedAt": datetime.utcnow()})
+@router.post("/{post_id}/regenerate-image", response_model=Post)
+async def regenerate_image(post_id: str, request: Request) -> Response:
+    _require(post_id)
+    if _respond_async(request):
+        return _accepted(await jobs.submit("regenerate-image", {"postId": post_id}, post_id=post_id))
+    return post_response(await _regenerate_image({"postId": post_id}))
+
+
+@jobs.register("regenerate-text")
+async def _regenerate_text(params: Dict[str, Any], report: Reporter = _no_report) -> Post:
+    p = _require(params["postId"])
+    report("generating text")
+    new_text = await llm_regenerate_text(p.title, p.text)
+    updated = await run_in_threadpool(PostsStore.update_fields, p.id, {"text": new_text, "updatedAt": datetime.utcnow()})
     assert updated
     return updated
 
 
-@router.post("/{post_id}/publish")
-def publish(post_id: str) -> Post:
-    p = PostsStore.get_by_id(post_id)
-    if not p:
-        raise HTTPException(status_code=404, detail="Not found")
+@router.post("/{post_id}/regenerate-text", response_model=Post)
+async def regenerate_text(post_id: str, request: Request) -> Response:
+    _require(post_id)
+    if _respond_async(request):
+        return _accepted(await jobs.submit("regenerate-text", {"postId": post_id}, post_id=post_id))
+    return post_response(await _regenerate_text({"postId": post_id}))
+
+
+@router.get("/{post_id}/regenerate-text/stream")
+async def regenerate_text_stream(post_id: str) -> StreamingResponse:
+    """Server-sent events version of regenerate-text: ``token`` per text delta (``reset`` if the fallback
+    restarts the text), ``saved`` with the updated Post, then ``done``."""
+    p = _require(post_id)
+
+    async def events() -> AsyncIterator[str]:
+        new_text = p.text
+        async for kind, value in stream_regenerated_text(p.title, p.text):
+            if kind == "token":
+                yield _sse("token", {"text": value})
+            elif kind == "reset":
+                yield _sse("reset", {})
+            else:
+                new_text = value
+        updated = await run_in_threadpool(PostsStore.update_fields, post_id, {"text": new_text, "updatedAt": datetime.utcnow()})
+        if updated is None:
+            yield _sse("error", {"detail": "Not found"})
+            return
+        yield _sse("saved", updated.json_bytes().decode())
+        yield _sse("done", {})
+
+    return _event_stream(events())
+
+
+def _require_publishable(post_id: str) -> Post:
+    p = _require(post_id)
     if p.status != "validated":
         raise HTTPException(status_code=400, detail="Post must be validated before publishing")
+    return p
 
-    result = publish_to_linkedin(text=p.text, title=p.title, image_url=p.imageUrl)
 
-    now = datetime.utcnow()
-    updated = PostsStore.update_fields(post_id, {
-        "status": "posted",
-        "postedAt": now,
-        "updatedAt": now,
-        "linkedinPostUrl": result.get("url"),
-    })
-    assert updated
+@jobs.register("publish")
+async def _publish(params: Dict[str, Any], report: Reporter = _no_report) -> Post:
+    p = _require_publishable(params["postId"])
+
+    report("publishing to LinkedIn")
+    updated = await scheduler.publish_post(p.id, f"manual:{new_id()}")
+    if updated is None:
+        raise HTTPException(status_code=409, detail="Post is already being published")
+    return updated
+
+
+@router.post("/{post_id}/publish", response_model=Post)
+async def publish(post_id: str, request: Request) -> Response:
+    _require_publishable(post_id)
+    if _respond_async(request):
+        return _accepted(await jobs.submit("publish", {"postId": post_id}, post_id=post_id))
+    return post_response(await _publish({"postId": post_id}))
+
+
+@router.post("/{post_id}/schedule", response_model=Post)
+async def schedule_post(post_id: str, payload: ScheduleRequest) -> Response:
+    """Set (or with ``scheduledAt: null`` clear) the time the scheduler publishes a validated post."""
+    when = sort_value(payload.scheduledAt) if payload.scheduledAt else None
+    # Store work (fsync, file locks) runs in the threadpool; only the scheduler wake-up needs the loop
+    updated = await run_in_threadpool(_set_schedule, post_id, when)
+    scheduler.schedule(updated)
+    return post_response(updated)
+
+
+def _set_schedule(post_id: str, when: Optional[datetime]) -> Post:
+    p = _require_publishable(post_id)
+    if p.publishKey:
+        raise HTTPException(status_code=409, detail="Post is already being published")
+    updated = PostsStore.update_fields(post_id, {"scheduledAt": when}, expect={"status": "validated", "publishKey": None})
+    if updated is None:
+        raise HTTPException(status_code=409, detail="Post changed while scheduling; try again")
     return updated
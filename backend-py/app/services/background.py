@@ -0,0 +1,30 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, Coroutine, Optional, Set
+from ..log import get_logger
+
+log = get_logger("background")
+
+# Strong references: the event loop only keeps weak ones, so untracked tasks can be collected mid-flight
+_tasks: Set["asyncio.Task[Any]"] = set()
+
+
+def _on_done(task: "asyncio.Task[Any]") -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Task %s failed: %r", task.get_name(), task.exception())
+
+
+def spawn(coro: Coroutine[Any, Any, Any], *, name: Optional[str] = None) -> "asyncio.Task[Any]":
+    """Run a coroutine after the current request returns."""
+    task = asyncio.get_running_loop().create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def drain(timeout: float) -> None:
+    """Wait up to ``timeout`` seconds for outstanding background tasks (called on shutdown)."""
+    pending = [t for t in _tasks if not t.done()]
+    if pending:
+        await asyncio.wait(pending, timeout=timeout)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+import httpx
+from .. import metrics
+from ..config import ProviderConfig, settings
+from . import resilience
+from ..log import get_logger
+
+log = get_logger("http")
+
+try:  # HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class _Provider:
+    """Keep-alive connection pool plus an in-flight cap for one upstream provider."""
+
+    def __init__(self, name: str, config: ProviderConfig) -> None:
+        self.name = name
+        self.config = config
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(config.timeout),
+            limits=httpx.Limits(
+                max_connections=config.concurrency,
+                max_keepalive_connections=config.concurrency,
+                keepalive_expiry=60,
+            ),
+            follow_redirects=True,
+        )
+        self.semaphore = asyncio.Semaphore(config.concurrency)
+
+
+# Pools are bound to the event loop that opened them, so key them by loop as well
+_providers: Dict[Tuple[str, int], _Provider] = {}
+
+
+def _config_for(name: str) -> ProviderConfig:
+    config = getattr(settings.providers, name, None)
+    if config is None:
+        raise KeyError(f"Unknown provider {name!r}")
+    return config
+
+
+def get_provider(name: str) -> _Provider:
+    key = (name, id(asyncio.get_running_loop()))
+    provider = _providers.get(key)
+    if provider is None:
+        provider = _providers[key] = _Provider(name, _config_for(name))
+    return provider
+
+
+async def request(provider: str, method: str, url: str, *, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+    """Send a request through the provider's pooled client, waiting for a free concurrency slot first.
+
+    Raises resilience.ProviderUnavailable without calling out while the provider's breaker is open or its
+    rate limit would hold the call past the timeout. 429/5xx responses and errors count as breaker failures.
+    """
+    p = get_provider(provider)
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    started = time.perf_counter()
+    result = "error"
+    try:
+        async with resilience.guard(provider).call(max_wait=timeout) as outcome:
+            async with p.semaphore:
+                resp = await p.client.request(method, url, **kwargs)
+            result = _status_class(resp.status_code)
+            outcome.check_status(resp.status_code)
+        return resp
+    except resilience.ProviderUnavailable:
+        result = "rejected"
+        raise
+    finally:
+        metrics.record_provider(provider, result, time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def stream(provider: str, method: str, url: str, *, timeout: Optional[float] = None, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    """Like request(), but the body is read incrementally; the concurrency slot is held until the block exits.
+
+    As with request(), only 429/5xx responses and errors reading the body count as breaker failures: an
+    error the caller raises over a response that was already classified (``raise_for_status()`` on a 4xx,
+    say) leaves the breaker alone and is re-raised once the call is settled.
+    """
+    p = get_provider(provider)
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    started = time.perf_counter()
+    result = "error"
+    caller_error: Optional[Exception] = None
+    try:
+        async with resilience.guard(provider).call(max_wait=timeout) as outcome:
+            async with p.semaphore:
+                async with p.client.stream(method, url, **kwargs) as resp:
+                    result = _status_class(resp.status_code)
+                    outcome.check_status(resp.status_code)
+                    try:
+                        yield resp
+                    except Exception as e:
+                        if outcome.failed or isinstance(e, httpx.TransportError):
+                            raise
+                        caller_error = e
+        if caller_error is not None:
+            raise caller_error
+    except resilience.ProviderUnavailable:
+        result = "rejected"
+        raise
+    finally:
+        # Covers the whole body, since that is what the caller waited for
+        metrics.record_provider(provider, result, time.perf_counter() - started)
+
+
+def _status_class(status: int) -> str:
+    return "429" if status == 429 else f"{status // 100}xx"
+
+
+# Worth retrying for any request; for non-idempotent ones only statuses that mean "not processed"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+UNPROCESSED_STATUSES = frozenset({429, 503})
+
+
+async def with_retries(
+    send: Callable[[], Awaitable[httpx.Response]],
+    *,
+    label: str,
+    attempts: int,
+    base_delay: float,
+    max_delay: float = 8.0,
+    idempotent: bool = True,
+) -> httpx.Response:
+    """Call ``send`` until it returns a non-retryable response, at most ``attempts`` times.
+
+    Waits between attempts use full jitter: uniform(0, min(max_delay, base_delay * 2**n)). Transport errors
+    are retried too, except that a non-idempotent request is only retried when it never reached the server
+    (connect/pool errors). The last response is returned as-is and the last error is re-raised.
+    """
+    statuses = RETRY_STATUSES if idempotent else UNPROCESSED_STATUSES
+    errors = (httpx.TransportError,) if idempotent else (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    attempts = max(1, attempts)
+    for attempt in range(1, attempts + 1):
+        try:
+            resp = await send()
+        except errors as e:
+            if attempt == attempts:
+                raise
+            reason = repr(e)
+        else:
+            if resp.status_code not in statuses or attempt == attempts:
+                return resp
+            reason = f"HTTP {resp.status_code}"
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+        log.warning("%s attempt %d/%d failed (%s); retrying in %.2fs", label, attempt, attempts, reason, delay)
+        await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+async def preconnect(provider: str, connections: int, timeout: float = 5.0) -> int:
+    """Open up to ``connections`` keep-alive connections to the provider's origin, so the first real calls skip
+    DNS, TCP and TLS setup. Bypasses the breaker and rate limiter. Returns how many probes got any response."""
+    p = get_provider(provider)
+
+    async def probe() -> bool:
+        try:
+            await p.client.head(p.config.base_url + "/", timeout=timeout)
+            return True
+        except httpx.HTTPError:
+            return False
+
+    # Concurrent probes each need their own connection (over HTTP/2 they share one)
+    return sum(await asyncio.gather(*(probe() for _ in range(max(1, connections)))))
+
+
+async def aclose_all() -> None:
+    """Close the pools opened on the current event loop (called on shutdown)."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _providers if k[1] == loop_id]:
+        await _providers.pop(key).client.aclose()
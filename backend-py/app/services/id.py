@@ -1,7 +1,10 @@
 from __future__ import annotations
 import uuid
+from ..log import get_logger
+
+log = get_logger("id")
 
 def new_id() -> str:
     _id = str(uuid.uuid4())
-    print(f"[ID] Generated new UUID: {_id}")
+    log.debug("Generated new UUID: %s", _id)
     return _id
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import io
+import os
+import re
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+from .. import metrics
+from ..config import settings
+from ..db.store import DATA_DIR
+from . import http
+from ..log import get_logger
+
+log = get_logger("images")
+
+IMAGES_DIR = DATA_DIR / "images"
+CHUNK_SIZE = 64 * 1024
+# Generated images are a few MB; anything far larger is not an image we asked for
+MAX_DOWNLOAD_BYTES = 32 * 1024 * 1024
+
+_CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp", "gif": "image/gif"}
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_LOCAL_URL_RE = re.compile(r"(?:^|/)images/([0-9a-f]{32})$")
+
+
+def _sniff(data: bytes) -> str:
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    raise ValueError("Unrecognized image format")
+
+
+def _transcode(data: bytes) -> Tuple[bytes, str]:
+    """Re-encode as a JPEG no wider/taller than IMAGE_MAX_SIDE and, where possible, no larger than IMAGE_MAX_BYTES.
+
+    Quality steps down first, then the image is shrunk. Without Pillow the original bytes are kept as-is.
+    """
+    ext = _sniff(data)
+    try:
+        from PIL import Image  # Optional: pip install Pillow
+    except ImportError:
+        log.warning("Pillow not installed; storing the image without transcoding")
+        return data, ext
+
+    img = Image.open(io.BytesIO(data))
+    img = img.convert("RGB")
+    img.thumbnail((settings.image_max_side, settings.image_max_side), Image.LANCZOS)
+    out = b""
+    for _shrink in range(4):
+        for quality in (88, 80, 72, 64):
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+            out = buf.getvalue()
+            if len(out) <= settings.image_max_bytes:
+                return out, "jpg"
+        img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)), Image.LANCZOS)
+    return out, "jpg"
+
+
+def _save(data: bytes, ext: str) -> str:
+    # Content-addressed: the same bytes always map to the same id, which doubles as the ETag
+    image_id = hashlib.sha256(data).hexdigest()[:32]
+    path = IMAGES_DIR / f"{image_id}.{ext}"
+    if not path.exists():
+        IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return image_id
+
+
+@metrics.timed("image.store")
+async def store_remote_image(url: str) -> str:
+    """Download an image once, transcode it and save it under data/images. Returns the image id."""
+    buf = bytearray()
+    async with http.stream("assets", "GET", url) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+            buf.extend(chunk)
+            if len(buf) > MAX_DOWNLOAD_BYTES:
+                raise ValueError(f"Image larger than {MAX_DOWNLOAD_BYTES} bytes")
+    size_in = len(buf)
+    # Decoding and encoding a 1792x1024 image is CPU-bound; keep it off the event loop
+    data, ext = await asyncio.to_thread(_transcode, bytes(buf))
+    image_id = await asyncio.to_thread(_save, data, ext)
+    log.info("Stored image id=%s bytes_in=%d bytes_out=%d format=%s", image_id, size_in, len(data), ext)
+    return image_id
+
+
+def image_url(image_id: str) -> str:
+    return f"{settings.public_base_url.rstrip('/')}/images/{image_id}"
+
+
+def image_path(image_id: str) -> Optional[Path]:
+    """Path of a stored image, or None if the id is malformed or unknown."""
+    if not _ID_RE.match(image_id):
+        return None
+    for ext in _CONTENT_TYPES:
+        path = IMAGES_DIR / f"{image_id}.{ext}"
+        if path.exists():
+            return path
+    return None
+
+
+def local_image_path(url: str) -> Optional[Path]:
+    """Path of the stored image an ``imageUrl`` points at, or None for remote URLs."""
+    m = _LOCAL_URL_RE.search(url or "")
+    return image_path(m.group(1)) if m else None
+
+
+def content_type(path: Path) -> str:
+    return _CONTENT_TYPES.get(path.suffix.lstrip("."), "application/octet-stream")
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    """Stream a stored image from disk in CHUNK_SIZE pieces."""
+    with path.open("rb") as fh:
+        while True:
+            chunk = await asyncio.to_thread(fh.read, CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
@@ -1,7 +1,17 @@
 from __future__ import annotations
 import re
-import requests
+from typing import Any, Dict
+from urllib.parse import quote
+from .. import metrics
 from ..config import settings
+from . import http
+from .image_store import image_url, store_remote_image
+from .single_flight import prompt_cache, prompt_key
+from ..log import get_logger
+
+log = get_logger("images")
+
+IMAGE_MODEL = "dall-e-3"
 
 
 def _safe_keyword(s: str) -> str:
@@ -10,42 +20,56 @@ def _safe_keyword(s: str) -> str:
     return (s or "post")[:24]
 
 
-def generate_image(description: str) -> str:
-    print(f"[IMAGES] generate_image called with description length={len(description) if description else 0}")
+async def _openai_image(body: Dict[str, Any]) -> str:
+    log.debug("Requesting image from OpenAI Images API")
+    resp = await http.request(
+        "openai",
+        "POST",
+        f"{settings.providers.openai.base_url}/v1/images/generations",
+        json=body,
+        headers={
+            "authorization": f"Bearer {settings.openai_api_key}",
+            "content-type": "application/json",
+        },
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    url = (data.get("data") or [{}])[0].get("url")
+    if not url:
+        raise ValueError("No image URL in OpenAI response")
+    log.debug("Received URL from OpenAI: %s", url)
+    # OpenAI URLs expire after about an hour; keep our own copy
+    try:
+        return image_url(await store_remote_image(url))
+    except Exception as e:
+        log.warning("Could not store image locally: %r. Using the OpenAI URL", e)
+        return url
+
+
+@metrics.timed("image.generate")
+async def generate_image(description: str) -> str:
+    log.debug("generate_image description_length=%d", len(description or ""))
     if not settings.openai_api_key:
-        print("[IMAGES] No OpenAI API key. Using placeholder image (picsum).")
+        log.debug("No OpenAI API key. Using placeholder image (picsum)")
         seed = _safe_keyword(description)
-        url = f"https://picsum.photos/seed/{requests.utils.quote(seed + '-lg')}/800/450"
-        print(f"[IMAGES] Placeholder URL={url}")
+        url = f"https://picsum.photos/seed/{quote(seed + '-lg')}/800/450"
+        log.debug("Placeholder URL=%s", url)
         return url
 
+    body = {
+        "model": IMAGE_MODEL,
+        "prompt": description,
+        "size": "1792x1024",
+        "quality": "hd",
+        "n": 1,
+    }
     try:
-        print("[IMAGES] Requesting image from OpenAI Images API...")
-        resp = requests.post(
-            "https://api.openai.com/v1/images/generations",
-            json={
-                "model": "dall-e-3",
-                "prompt": description,
-                "size": "1792x1024",
-                "quality": "hd",
-                "n": 1,
-            },
-            headers={
-                "authorization": f"Bearer {settings.openai_api_key}",
-                "content-type": "application/json",
-            },
-            timeout=30,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        url = (data.get("data") or [{}])[0].get("url")
-        if url:
-            print(f"[IMAGES] Received URL from OpenAI: {url}")
-            return url
-    except Exception:
-        print("[IMAGES] Exception calling OpenAI Images API. Falling back to placeholder.")
+        # Identical concurrent requests share one paid generation, and exact repeats reuse it for a short while
+        return await prompt_cache.run(prompt_key("generate_image", IMAGE_MODEL, body), lambda: _openai_image(body))
+    except Exception as e:
+        log.warning("OpenAI Images API failed: %r. Falling back to placeholder", e)
 
     seed = _safe_keyword(description)
-    url = f"https://picsum.photos/seed/{requests.utils.quote(seed + '-lg')}/800/450"
-    print(f"[IMAGES] Fallback placeholder URL={url}")
+    url = f"https://picsum.photos/seed/{quote(seed + '-lg')}/800/450"
+    log.debug("Fallback placeholder URL=%s", url)
     return url
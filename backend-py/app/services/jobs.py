@@ -0,0 +1,186 @@
+from __future__ import annotations
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from ..config import settings
+from ..db.store import JobsStore
+from ..models import Job, Post
+from . import workers
+from .id import new_id
+from ..log import get_logger
+
+log = get_logger("jobs")
+
+# Operations report progress by naming the step they are on
+Reporter = Callable[[str], None]
+Handler = Callable[[Dict[str, Any], Reporter], Awaitable[Post]]
+
+TERMINAL = ("succeeded", "failed")
+
+# How long watch() waits for an update from this process before re-reading the store; a job accepted by a
+# sibling worker is only seen that way
+WATCH_POLL_S = 1.0
+
+_handlers: Dict[str, Handler] = {}
+_queue: Optional["asyncio.Queue[str]"] = None
+_workers: List["asyncio.Task[None]"] = []
+_subscribers: Dict[str, Set["asyncio.Queue[Job]"]] = {}
+
+
+def register(kind: str) -> Callable[[Handler], Handler]:
+    """Register the coroutine that runs jobs of ``kind``. It receives the job params and a progress reporter."""
+    def decorator(fn: Handler) -> Handler:
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def recover_orphans() -> int:
+    """Mark failed the unfinished jobs whose owner process has died (or that have none), and return how many.
+    They are not re-run, since that (e.g. a publish) could repeat side effects; jobs of live siblings are left
+    alone."""
+    recovered = 0
+    for job in JobsStore.unfinished():
+        if workers.is_alive(job.owner):
+            continue
+        # Straight to the store: this may run off the event loop, and watchers poll the store anyway
+        now = datetime.utcnow()
+        JobsStore.upsert(job.model_copy(update={
+            "status": "failed", "error": "Interrupted because the server process stopped",
+            "finishedAt": now, "updatedAt": now,
+        }))
+        recovered += 1
+        log.warning("Failed interrupted job id=%s owner=%s", job.id, job.owner)
+    return recovered
+
+
+def start() -> None:
+    """Start the worker pool on the running loop, after failing jobs left unfinished by processes that
+    have died. Jobs of siblings that die later are recovered by the workers sweep."""
+    global _queue
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue()
+    recover_orphans()
+    workers.on_sweep(recover_orphans)
+    for n in range(max(1, settings.job_workers)):
+        _workers.append(asyncio.get_running_loop().create_task(_worker(), name=f"job-worker-{n}"))
+    log.info("Started workers=%d", len(_workers))
+
+
+async def stop() -> None:
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+async def submit(kind: str, params: Optional[Dict[str, Any]] = None, *, post_id: Optional[str] = None) -> Job:
+    """Persist a queued job and hand it to the worker pool."""
+    if kind not in _handlers:
+        raise KeyError(f"No handler registered for job kind {kind!r}")
+    start()
+    assert _queue is not None
+    now = datetime.utcnow()
+    job = Job(
+        id=new_id(), kind=kind, params=params or {}, postId=post_id, status="queued",
+        owner=workers.worker_id(), createdAt=now, updatedAt=now,
+    )
+    # The store write takes a file lock and fsyncs; keep it off the event loop
+    await asyncio.to_thread(JobsStore.upsert, job)
+    _queue.put_nowait(job.id)
+    log.info("Queued job id=%s kind=%s depth=%d", job.id, kind, _queue.qsize())
+    return job
+
+
+def _persist(job: Job, after: Optional["asyncio.Task[None]"]) -> "asyncio.Task[None]":
+    """Write ``job`` to the store in a thread, once ``after`` (the job's previous write) has landed, then pass
+    it to this process's watchers, so a watcher never sees a state that GET /jobs/{id} does not return yet."""
+    async def write() -> None:
+        if after is not None:
+            await asyncio.wait([after])
+        try:
+            await asyncio.to_thread(JobsStore.upsert, job)
+        except Exception as e:
+            log.exception("Saving job id=%s status=%s failed: %r", job.id, job.status, e)
+        for q in _subscribers.get(job.id, ()):
+            q.put_nowait(job)
+    return asyncio.get_running_loop().create_task(write(), name=f"job-save-{job.id}")
+
+
+async def _worker() -> None:
+    assert _queue is not None
+    queue = _queue
+    while True:
+        job_id = await queue.get()
+        try:
+            await _run(job_id)
+        except Exception as e:
+            log.exception("Worker error on job id=%s: %r", job_id, e)
+        finally:
+            queue.task_done()
+
+
+async def _run(job_id: str) -> None:
+    job = await asyncio.to_thread(JobsStore.get, job_id)
+    if job is None or job.status != "queued":
+        return
+    # Reporters are synchronous, so each state is saved by a task chained to the previous one
+    saving: Optional["asyncio.Task[None]"] = None
+
+    def update(**changes: Any) -> None:
+        nonlocal job, saving
+        job = job.model_copy(update={**changes, "updatedAt": datetime.utcnow()})
+        saving = _persist(job, saving)
+
+    def report(stage: str) -> None:
+        update(stage=stage)
+
+    update(status="running", stage="started", startedAt=datetime.utcnow())
+    try:
+        post = await _handlers[job.kind](job.params, report)
+    except Exception as e:
+        # HTTPException carries the user-facing reason in .detail
+        error = str(getattr(e, "detail", "") or e) or type(e).__name__
+        update(status="failed", error=error, finishedAt=datetime.utcnow())
+        log.warning("Job id=%s failed: %s", job_id, error)
+    else:
+        update(status="succeeded", stage="done", result=post, postId=post.id, finishedAt=datetime.utcnow())
+        log.info("Job id=%s succeeded", job_id)
+    assert saving is not None
+    await saving
+
+
+async def watch(job_id: str) -> AsyncIterator[Job]:
+    """Yield the job's current state, then each update, until it finishes.
+
+    Updates made in this process arrive at once. When none arrives for WATCH_POLL_S (the job runs in a
+    sibling worker, or this one is busy), the store is re-read instead.
+    """
+    q: "asyncio.Queue[Job]" = asyncio.Queue()
+    # Subscribe before reading the current state so no update falls in between
+    _subscribers.setdefault(job_id, set()).add(q)
+    try:
+        job = await asyncio.to_thread(JobsStore.get, job_id)
+        if job is None:
+            return
+        yield job
+        while job.status not in TERMINAL:
+            try:
+                latest: Optional[Job] = await asyncio.wait_for(q.get(), WATCH_POLL_S)
+            except asyncio.TimeoutError:
+                latest = await asyncio.to_thread(JobsStore.get, job_id)
+                if latest is None:
+                    return
+            if latest.updatedAt <= job.updatedAt:
+                continue
+            job = latest
+            yield job
+    finally:
+        subs = _subscribers.get(job_id)
+        if subs is not None:
+            subs.discard(q)
+            if not subs:
+                del _subscribers[job_id]
@@ -1,8 +1,14 @@
 from __future__ import annotations
-from typing import Dict, Optional
-import requests
+from typing import Awaitable, Callable, Dict, Optional
+import httpx
+from .. import metrics
 from ..config import settings
+from . import http
 from ..db.store import AuthStore
+from .image_store import CHUNK_SIZE, content_type, local_image_path, read_chunks
+from ..log import get_logger
+
+log = get_logger("linkedin")
 
 
 class PublishResult(Dict[str, Optional[str]]):
@@ -10,15 +16,19 @@ class PublishResult(Dict[str, Optional[str]]):
     assetUrn: Optional[str]
 
 
-def _fetch_image_bytes(url: str) -> bytes:
-    resp = requests.get(url, timeout=20)
-    resp.raise_for_status()
-    return resp.content
+async def _send(label: str, send: Callable[[], Awaitable[httpx.Response]], *, idempotent: bool = True) -> httpx.Response:
+    cfg = settings.linkedin
+    return await http.with_retries(
+        send, label=f"linkedin {label}", attempts=cfg.retry_attempts, base_delay=cfg.retry_base_delay, idempotent=idempotent
+    )
 
 
-def _register_image_upload(owner_urn: str, access_token: str) -> Dict[str, str]:
-    resp = requests.post(
-        "https://api.linkedin.com/v2/assets?action=registerUpload",
+async def _register_image_upload(owner_urn: str, access_token: str) -> Dict[str, str]:
+    # A retried register at worst leaves an unused asset behind
+    resp = await _send("register", lambda: http.request(
+        "linkedin",
+        "POST",
+        f"{settings.providers.linkedin.base_url}/v2/assets?action=registerUpload",
         json={
             "registerUploadRequest": {
                 "owner": owner_urn,
@@ -30,8 +40,7 @@ def _register_image_upload(owner_urn: str, access_token: str) -> Dict[str, str]:
             }
         },
         headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
-        timeout=20,
-    )
+    ))
     resp.raise_for_status()
     value = resp.json().get("value", {})
     mech = value.get("uploadMechanism", {}).get("com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest", {})
@@ -42,15 +51,34 @@ def _register_image_upload(owner_urn: str, access_token: str) -> Dict[str, str]:
     return {"uploadUrl": upload_url, "asset": asset}
 
 
-def _upload_image(upload_url: str, data: bytes) -> None:
-    resp = requests.put(upload_url, data=data, headers={"Content-Type": "image/jpeg"}, timeout=20)
+async def _put_image(upload_url: str, image_url: str) -> httpx.Response:
+    """One upload attempt, streamed from the stored file or piped from the remote source; never buffers the image."""
+    local = local_image_path(image_url)
+    if local is not None:
+        headers = {"Content-Type": content_type(local), "Content-Length": str(local.stat().st_size)}
+        return await http.request("linkedin", "PUT", upload_url, content=read_chunks(local), headers=headers)
+    # Posts whose image was never stored locally (older posts, or a failed download at generation time)
+    async with http.stream("assets", "GET", image_url) as src:
+        src.raise_for_status()
+        headers = {"Content-Type": src.headers.get("content-type", "image/jpeg")}
+        if "content-length" in src.headers and "content-encoding" not in src.headers:
+            headers["Content-Length"] = src.headers["content-length"]
+        return await http.request("linkedin", "PUT", upload_url, content=src.aiter_bytes(CHUNK_SIZE), headers=headers)
+
+
+async def _upload_image(upload_url: str, image_url: str) -> None:
+    # Each attempt reopens the source, since a streamed body cannot be replayed
+    resp = await _send("upload", lambda: _put_image(upload_url, image_url))
     if resp.status_code >= 300:
         raise RuntimeError("LinkedIn image upload failed")
 
 
-def _create_share(owner_urn: str, asset_urn: str, text: str, title: str, access_token: str) -> str:
-    resp = requests.post(
-        "https://api.linkedin.com/v2/ugcPosts",
+async def _create_share(owner_urn: str, asset_urn: str, text: str, title: str, access_token: str) -> str:
+    # Not idempotent: only retried when LinkedIn cannot have created the post, so a retry never double-posts
+    resp = await _send("share", lambda: http.request(
+        "linkedin",
+        "POST",
+        f"{settings.providers.linkedin.base_url}/v2/ugcPosts",
         json={
             "author": owner_urn,
             "lifecycleState": "PUBLISHED",
@@ -66,8 +94,7 @@ def _create_share(owner_urn: str, asset_urn: str, text: str, title: str, access_
             "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
         },
         headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
-        timeout=20,
-    )
+    ), idempotent=False)
     resp.raise_for_status()
     urn = resp.json().get("id")
     if not urn:
@@ -75,7 +102,7 @@ def _create_share(owner_urn: str, asset_urn: str, text: str, title: str, access_
     return f"https://www.linkedin.com/feed/update/{urn}"
 
 
-def publish_to_linkedin(*, text: str, title: str, image_url: str) -> PublishResult:
+async def publish_to_linkedin(*, text: str, title: str, image_url: str) -> PublishResult:
     auth = AuthStore.get_linkedin()
     token = auth.get("accessToken") or settings.linkedin.access_token
     owner_urn = (
@@ -89,8 +116,15 @@ def publish_to_linkedin(*, text: str, title: str, image_url: str) -> PublishResu
         # Stub mode
         return {"url": f"https://www.linkedin.com/feed/update/urn:li:activity:{int(1e12)}"}
 
-    reg = _register_image_upload(owner_urn, token)
-    bytes_data = _fetch_image_bytes(image_url)
-    _upload_image(reg["uploadUrl"], bytes_data)
-    url = _create_share(owner_urn, reg["asset"], text, title, token)
+    with metrics.span("linkedin.publish") as total:
+        with metrics.span("linkedin.register") as register:
+            reg = await _register_image_upload(owner_urn, token)
+        with metrics.span("linkedin.upload") as upload:
+            await _upload_image(reg["uploadUrl"], image_url)
+        with metrics.span("linkedin.share") as share:
+            url = await _create_share(owner_urn, reg["asset"], text, title, token)
+    log.info(
+        "Published register_ms=%.0f upload_ms=%.0f share_ms=%.0f total_ms=%.0f",
+        register.seconds * 1000, upload.seconds * 1000, share.seconds * 1000, total.seconds * 1000,
+    )
     return {"url": url, "assetUrn": reg["asset"]}
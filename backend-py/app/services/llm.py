@@ -1,9 +1,15 @@
 from __future__ import annotations
-from typing import List, Optional, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import random
+import re
 import json
-import requests
+from .. import metrics
 from ..config import settings
+from . import http
+from .single_flight import prompt_cache, prompt_key
+from ..log import get_logger
+
+log = get_logger("llm")
 
 TOPICS = [
     'AI productivity', 'Remote work', 'Leadership', 'Career growth', 'Developer tools', 'Open source',
@@ -26,7 +32,7 @@ def _random_of(arr: List[str]) -> str:
 
 
 def _stub_generate(existing_ideas: List[str], topic: Optional[str]) -> Dict[str, str]:
-    print("[LLM] Using stub generator for post idea.")
+    log.info("Using stub generator for post idea")
     topic = topic or _random_of(TOPICS)
     title = _random_of([
         f"Thoughts on {topic}",
@@ -41,12 +47,18 @@ def _stub_generate(existing_ideas: List[str], topic: Optional[str]) -> Dict[str,
     return {"name": name, "idea": idea, "title": title, "text": text, "image": image}
 
 
-def generate_post_idea(*, existing_ideas: List[str], topic: Optional[str] = None, research_snippets: Optional[List[str]] = None) -> Dict[str, str]:
-    print(f"[LLM] generate_post_idea called. existing_ideas_count={len(existing_ideas)}, topic={topic!r}, research_snippets_count={len(research_snippets or [])}")
-    if not settings.anthropic_api_key:
-        print("[LLM] No Anthropic API key. Falling back to stub generator.")
-        return _stub_generate(existing_ideas, topic)
+ANTHROPIC_MESSAGES_URL = f"{settings.providers.anthropic.base_url}/v1/messages"
+
+
+def _anthropic_headers() -> Dict[str, str]:
+    return {
+        "x-api-key": settings.anthropic_api_key,
+        "anthropic-version": "2023-06-01",
+        "content-type": "application/json",
+    }
 
+
+def _idea_body(existing_ideas: List[str], topic: Optional[str], research_snippets: Optional[List[str]], bucket: Optional[str]) -> Dict[str, Any]:
     used_ideas = [x for x in existing_ideas if x][:20]
     research = (research_snippets or [])[:5]
     prompt_lines = [
@@ -61,75 +73,204 @@ def generate_post_idea(*, existing_ideas: List[str], topic: Optional[str] = None
         prompt_lines.append("Inspiration from research: " + " | ".join(research))
     if topic:
         prompt_lines.append(f"Focus topic: {topic}")
+    if bucket:
+        prompt_lines.append(f"The idea must start with this content category: {bucket}")
     prompt = "\n".join(prompt_lines)
+    return {
+        "model": "claude-3-5-sonnet-20240620",
+        "max_tokens": 600,
+        "temperature": 0.7,
+        "system": "Always respond with valid JSON only.",
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+def _parse_idea(text: str, topic: Optional[str]) -> Dict[str, str]:
+    parsed = json.loads(text)
+    return {
+        "name": str(parsed.get("name", "")),
+        "idea": str(parsed.get("idea", topic or "")),
+        "title": str(parsed.get("title", "Untitled")),
+        "text": str(parsed.get("text", "...")),
+        "image": str(parsed.get("image", parsed.get("title") or parsed.get("idea") or "Abstract tech illustration")),
+    }
+
+
+def _regenerate_body(current_title: str, current_text: str) -> Dict[str, Any]:
+    return {
+        "model": "claude-3-5-sonnet-20240620",
+        "max_tokens": 400,
+        "temperature": 0.7,
+        "system": "Return only the improved post text (no JSON).",
+        "messages": [
+            {"role": "user", "content": f"Improve and tighten this LinkedIn post while preserving the author's voice. Title: {current_title}\n\nPost:\n{current_text}"},
+        ],
+    }
+
+
+def _stub_regenerate(current_text: str) -> str:
+    return current_text + "\n\n(Updated for clarity and brevity.)"
+
+
+async def _stream_text(body: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """Yield text deltas from a streaming Anthropic messages call as they arrive."""
+    async with http.stream(
+        "anthropic",
+        "POST",
+        ANTHROPIC_MESSAGES_URL,
+        json={**body, "stream": True},
+        headers=_anthropic_headers(),
+        timeout=timeout,
+    ) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            kind = event.get("type")
+            if kind == "content_block_delta":
+                text = (event.get("delta") or {}).get("text")
+                if text:
+                    yield text
+            elif kind == "message_stop":
+                return
+            elif kind == "error":
+                raise RuntimeError(f"Anthropic stream error: {event.get('error')}")
+
+
+def _chunks(text: str) -> List[str]:
+    # Word-sized pieces so stub output streams like model output does
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+async def stream_post_idea(
+    *,
+    existing_ideas: List[str],
+    topic: Optional[str] = None,
+    research_snippets: Optional[List[str]] = None,
+    bucket: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Streaming variant of generate_post_idea.
+
+    Yields ("token", str) for each text delta of the JSON being generated, then
+    one ("idea", dict) with the parsed result. If the call fails after tokens
+    were sent, yields ("reset", None) before streaming the stub fallback.
+    """
+    if settings.anthropic_api_key:
+        received: List[str] = []
+        try:
+            async for delta in _stream_text(_idea_body(existing_ideas, topic, research_snippets, bucket)):
+                received.append(delta)
+                yield "token", delta
+            yield "idea", _parse_idea("".join(received), topic)
+            return
+        except Exception as e:
+            log.warning("Streaming idea generation failed: %r. Falling back to stub", e)
+            if received:
+                yield "reset", None
+    idea = _stub_generate(existing_ideas, topic)
+    for piece in _chunks(json.dumps(idea, ensure_ascii=False)):
+        yield "token", piece
+    yield "idea", idea
+
+
+async def stream_regenerated_text(current_title: str, current_text: str) -> AsyncIterator[Tuple[str, Any]]:
+    """Streaming variant of regenerate_text: ("token", str) deltas, then ("text", str) with the final text."""
+    if settings.anthropic_api_key:
+        body = _regenerate_body(current_title, current_text)
+        key = _regenerate_key(body)
+        cached = prompt_cache.get(key)
+        if cached is not None:
+            for piece in _chunks(cached):
+                yield "token", piece
+            yield "text", cached
+            return
+        received: List[str] = []
+        try:
+            async for delta in _stream_text(body, timeout=15):
+                received.append(delta)
+                yield "token", delta
+            text = "".join(received).strip()
+            if text:
+                prompt_cache.put(key, text)
+            yield "text", text or current_text
+            return
+        except Exception as e:
+            log.warning("Streaming text regeneration failed: %r. Falling back to stub", e)
+            if received:
+                yield "reset", None
+    text = _stub_regenerate(current_text)
+    for piece in _chunks(text):
+        yield "token", piece
+    yield "text", text
+
+
+@metrics.timed("llm.idea")
+async def generate_post_idea(
+    *,
+    existing_ideas: List[str],
+    topic: Optional[str] = None,
+    research_snippets: Optional[List[str]] = None,
+    bucket: Optional[str] = None,
+) -> Dict[str, str]:
+    log.debug("generate_post_idea existing_ideas=%d topic=%r research_snippets=%d", len(existing_ideas), topic, len(research_snippets or []))
+    if not settings.anthropic_api_key:
+        log.debug("No Anthropic API key. Falling back to stub generator")
+        return _stub_generate(existing_ideas, topic)
 
     try:
-        print("[LLM] Requesting Anthropic messages API for idea generation...")
-        resp = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            json={
-                "model": "claude-3-5-sonnet-20240620",
-                "max_tokens": 600,
-                "temperature": 0.7,
-                "system": "Always respond with valid JSON only.",
-                "messages": [{"role": "user", "content": prompt}],
-            },
-            headers={
-                "x-api-key": settings.anthropic_api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json",
-            },
-            timeout=20,
+        log.debug("Requesting Anthropic messages API for idea generation")
+        resp = await http.request(
+            "anthropic",
+            "POST",
+            ANTHROPIC_MESSAGES_URL,
+            json=_idea_body(existing_ideas, topic, research_snippets, bucket),
+            headers=_anthropic_headers(),
         )
         resp.raise_for_status()
         content = resp.json().get("content", [])
         text = content[0].get("text") if content else None
         if text:
             try:
-                print("[LLM] Parsing JSON response from Anthropic...")
-                parsed = json.loads(text)
-                return {
-                    "name": str(parsed.get("name", "")),
-                    "idea": str(parsed.get("idea", topic or "")),
-                    "title": str(parsed.get("title", "Untitled")),
-                    "text": str(parsed.get("text", "...")),
-                    "image": str(parsed.get("image", parsed.get("title") or parsed.get("idea") or "Abstract tech illustration")),
-                }
+                return _parse_idea(text, topic)
             except Exception:
-                print("[LLM] Failed to parse JSON from Anthropic response. Falling back to stub.")
+                log.warning("Failed to parse JSON from Anthropic response. Falling back to stub")
                 pass
-    except Exception:
-        print("[LLM] Exception during Anthropic request. Falling back to stub.")
+    except Exception as e:
+        log.warning("Anthropic request failed: %r. Falling back to stub", e)
 
     return _stub_generate(existing_ideas, topic)
 
 
-def regenerate_text(current_title: str, current_text: str) -> str:
+def _regenerate_key(body: Dict[str, Any]) -> str:
+    return prompt_key("regenerate_text", body["model"], body)
+
+
+async def _regenerate_upstream(body: Dict[str, Any]) -> str:
+    resp = await http.request(
+        "anthropic",
+        "POST",
+        ANTHROPIC_MESSAGES_URL,
+        json=body,
+        headers=_anthropic_headers(),
+        timeout=15,
+    )
+    resp.raise_for_status()
+    content = resp.json().get("content", [])
+    text = content[0].get("text") if content else None
+    if not text or not text.strip():
+        raise ValueError("Empty completion")
+    return text.strip()
+
+
+@metrics.timed("llm.regenerate")
+async def regenerate_text(current_title: str, current_text: str) -> str:
     if not settings.anthropic_api_key:
-        return current_text + "\n\n(Updated for clarity and brevity.)"
+        return _stub_regenerate(current_text)
 
+    body = _regenerate_body(current_title, current_text)
     try:
-        resp = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            json={
-                "model": "claude-3-5-sonnet-20240620",
-                "max_tokens": 400,
-                "temperature": 0.7,
-                "system": "Return only the improved post text (no JSON).",
-                "messages": [
-                    {"role": "user", "content": f"Improve and tighten this LinkedIn post while preserving the author's voice. Title: {current_title}\n\nPost:\n{current_text}"},
-                ],
-            },
-            headers={
-                "x-api-key": settings.anthropic_api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json",
-            },
-            timeout=15,
-        )
-        resp.raise_for_status()
-        content = resp.json().get("content", [])
-        text = content[0].get("text") if content else None
-        return text.strip() if text else current_text
+        # Identical concurrent requests (double submits, several editors) share one upstream call
+        return await prompt_cache.run(_regenerate_key(body), lambda: _regenerate_upstream(body))
     except Exception:
         return current_text
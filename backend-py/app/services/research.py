@@ -1,24 +1,39 @@
 from __future__ import annotations
 from typing import Optional
-import requests
+from .. import metrics
 from ..config import settings
+from . import http
+from .research_cache import research_cache
+from ..log import get_logger
 
+log = get_logger("research")
 
-def research_brief(topic: str) -> str:
+RESEARCH_MODEL = "llama-3.1-sonar-small-128k-online"
+
+
+@metrics.timed("research")
+async def research_brief(topic: str) -> str:
     """Return the best full-text answer from Perplexity for the given query.
 
     If PERPLEXITY_API_KEY is not set or any error occurs, returns an empty string.
+    Answers are cached per (model, normalized query) for RESEARCH_CACHE_TTL_S.
     """
-    print(f"[RESEARCH] research_brief called topic={topic!r}")
+    log.debug("research_brief topic=%r", topic)
     if not settings.perplexity_api_key:
-        print("[RESEARCH] No Perplexity API key. Skipping research and returning empty string.")
+        log.debug("No Perplexity API key. Skipping research")
         return ""
+    cached = await research_cache.get(topic, RESEARCH_MODEL)
+    if cached is not None:
+        log.debug("Cache hit")
+        return cached
     try:
-        print("[RESEARCH] Requesting Perplexity API...")
-        resp = requests.post(
-            "https://api.perplexity.ai/chat/completions",
+        log.debug("Requesting Perplexity API")
+        resp = await http.request(
+            "perplexity",
+            "POST",
+            f"{settings.providers.perplexity.base_url}/chat/completions",
             json={
-                "model": "llama-3.1-sonar-small-128k-online",
+                "model": RESEARCH_MODEL,
                 "messages": [
                     {"role": "system", "content": "Provide the best possible comprehensive answer with sources about the given query. Return plain text."},
                     {"role": "user", "content": topic},
@@ -30,12 +45,13 @@ def research_brief(topic: str) -> str:
                 "authorization": f"Bearer {settings.perplexity_api_key}",
                 "content-type": "application/json",
             },
-            timeout=15,
         )
         resp.raise_for_status()
         text: Optional[str] = resp.json().get("choices", [{}])[0].get("message", {}).get("content")
-        print(f"[RESEARCH] Perplexity response received. Length={len(text) if text else 0}")
+        log.debug("Perplexity response received length=%d", len(text or ""))
+        if text:
+            await research_cache.put(topic, RESEARCH_MODEL, text)
         return text or ""
-    except Exception:
-        print("[RESEARCH] Exception during Perplexity request. Returning empty string.")
+    except Exception as e:
+        log.warning("Perplexity request failed: %r. Returning empty string", e)
         return ""
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from ..config import settings
+
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a query, so trivial rephrasings share an entry."""
+    text = unicodedata.normalize("NFKC", query).lower()
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+def cache_key(query: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+
+class ResearchCache:
+    """Two-tier cache of research results keyed on (model, normalized query).
+
+    The memory tier is an LRU bounded by total entry size in bytes. The optional
+    disk tier is a SQLite table that survives restarts; disk hits are promoted
+    to memory. Every entry expires ``ttl`` seconds after it was stored.
+
+    The disk tier does blocking SQLite I/O, so it runs in a thread under its own
+    lock; the memory tier is served on the event loop.
+    """
+
+    def __init__(self, *, max_bytes: int, ttl: float, path: Optional[Path] = None) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        # key -> (expires_at, value, size in bytes)
+        self._memory: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0,
+        }
+
+    def _disk_conn(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._disk is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._disk = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS research_cache (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+        return self._disk
+
+    async def get(self, query: str, model: str) -> Optional[str]:
+        key = cache_key(query, model)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                self._drop(key)
+                self._stats["expired"] += 1
+        row = await asyncio.to_thread(self._disk_get, key, now) if self.path is not None else None
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if row[0] <= now:
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, row[1], row[0])
+            return row[1]
+
+    async def put(self, query: str, model: str, value: str) -> None:
+        key = cache_key(query, model)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(key, value, expires_at)
+        if self.path is not None:
+            await asyncio.to_thread(self._disk_put, key, value, expires_at)
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        """Read an entry from the disk tier, deleting it there if it has expired (returned all the same)."""
+        with self._disk_lock:
+            conn = self._disk_conn()
+            assert conn is not None
+            row = conn.execute("SELECT expires_at, value FROM research_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] <= now:
+                conn.execute("DELETE FROM research_cache WHERE key = ?", (key,))
+            return row
+
+    def _disk_put(self, key: str, value: str, expires_at: float) -> None:
+        with self._disk_lock:
+            conn = self._disk_conn()
+            assert conn is not None
+            conn.execute(
+                "INSERT OR REPLACE INTO research_cache (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, expires_at, value),
+            )
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._memory[key] = (expires_at, value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._memory), "bytes": self._bytes}
+
+
+research_cache = ResearchCache(
+    max_bytes=settings.research_cache_max_bytes,
+    ttl=settings.research_cache_ttl_s,
+    path=Path(settings.research_cache_path) if settings.research_cache_path else None,
+)
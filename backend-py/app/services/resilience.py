@@ -0,0 +1,201 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from ..config import ProviderConfig, settings
+from ..log import get_logger
+
+log = get_logger("resilience")
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised instead of calling a provider whose breaker is open or whose rate limit would delay the call
+    past its timeout. Callers treat it like any other provider failure and use their fallback at once."""
+
+
+class TokenBucket:
+    """Requests-per-minute limiter with bursts. Callers reserve a token and sleep until it is theirs."""
+
+    def __init__(self, rpm: float, burst: int) -> None:
+        self.rate = rpm / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token and return the seconds to wait before using it, or None (nothing taken) if that
+        would exceed ``max_wait``."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def available(self) -> float:
+        if self.rate <= 0:
+            return float("inf")
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; after ``reset_after`` seconds one trial call is let
+    through (half-open) and its outcome closes or re-opens the breaker."""
+
+    def __init__(self, name: str, threshold: int, reset_after: float) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.threshold > 0 and (self.state == "half_open" or self.failures >= self.threshold):
+                if self.state != "open":
+                    log.warning("%s breaker opened after %d consecutive failures", self.name, self.failures)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """The call was cancelled: it proves nothing, but frees the half-open trial slot."""
+        with self._lock:
+            self._trial = False
+
+
+class _Outcome:
+    """Lets the caller mark a completed call as failed (e.g. a 429 or 5xx response)."""
+
+    def __init__(self) -> None:
+        self.failed = False
+
+    def check_status(self, status_code: int) -> None:
+        self.failed = status_code == 429 or status_code >= 500
+
+
+class ProviderGuard:
+    """Rate limiter plus circuit breaker for one provider, shared by every event loop in the process."""
+
+    def __init__(self, name: str, config: ProviderConfig) -> None:
+        self.name = name
+        self.config = config
+        self.bucket = TokenBucket(config.rpm, config.burst)
+        self.breaker = CircuitBreaker(name, config.breaker_failures, config.breaker_reset_s)
+        self.rejected = 0
+        self.throttled = 0
+
+    def available(self) -> bool:
+        """Whether a call would currently be let through by the breaker (without using a trial slot)."""
+        b = self.breaker
+        return b.threshold <= 0 or b.state == "closed" or (
+            b.state == "open" and time.monotonic() - b.opened_at >= b.reset_after
+        )
+
+    @asynccontextmanager
+    async def call(self, max_wait: Optional[float] = None) -> AsyncIterator[_Outcome]:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise ProviderUnavailable(f"{self.name}: circuit open")
+        wait = self.bucket.reserve(self.config.timeout if max_wait is None else max_wait)
+        if wait is None:
+            self.breaker.abandon()
+            self.throttled += 1
+            raise ProviderUnavailable(f"{self.name}: rate limit")
+        settled = False
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            outcome = _Outcome()
+            try:
+                yield outcome
+            except Exception:
+                settled = True
+                self.breaker.failure()
+                raise
+            settled = True
+            if outcome.failed:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+        finally:
+            # Cancelled (also while waiting for a token) or closed early, e.g. GeneratorExit when an SSE client
+            # disconnects mid-stream: the call proves nothing, but must not keep the half-open trial slot
+            if not settled:
+                self.breaker.abandon()
+
+    def snapshot(self) -> Dict[str, Any]:
+        b = self.breaker
+        retry_in = max(0.0, b.reset_after - (time.monotonic() - b.opened_at)) if b.state == "open" else 0.0
+        tokens = self.bucket.available()
+        return {
+            "breaker": b.state if b.threshold > 0 else "disabled",
+            "consecutiveFailures": b.failures,
+            "retryInS": round(retry_in, 1),
+            "rpm": self.config.rpm or None,
+            "tokens": None if tokens == float("inf") else round(tokens, 2),
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+        }
+
+
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def guard(name: str) -> ProviderGuard:
+    g = _guards.get(name)
+    if g is None:
+        with _guards_lock:
+            g = _guards.get(name)
+            if g is None:
+                config = getattr(settings.providers, name, None)
+                if config is None:
+                    raise KeyError(f"Unknown provider {name!r}")
+                g = _guards[name] = ProviderGuard(name, config)
+    return g
+
+
+def available(name: str) -> bool:
+    return guard(name).available()
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    return {name: guard(name).snapshot() for name in ("anthropic", "perplexity", "openai", "linkedin", "assets")}
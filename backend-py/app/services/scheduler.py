@@ -0,0 +1,190 @@
+from __future__ import annotations
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from ..config import settings
+from ..db.store import PostsStore, sort_value
+from ..models import Post
+from . import workers
+from .linkedin import publish_to_linkedin
+from ..log import get_logger
+
+log = get_logger("scheduler")
+
+INTERRUPTED = "Publishing was interrupted because the server process stopped; check LinkedIn before publishing again"
+
+# (due time as naive UTC, post id); entries are never removed in place, stale ones are skipped when popped
+_heap: List[Tuple[datetime, str]] = []
+# Entries currently in the heap, so the same post and due time is only queued once
+_queued: Set[Tuple[datetime, str]] = set()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wake: Optional[asyncio.Event] = None
+_dispatcher: Optional["asyncio.Task[None]"] = None
+_running: Set["asyncio.Task[None]"] = set()
+
+
+async def publish_post(post_id: str, key: str, *, scheduled_at: Optional[datetime] = None) -> Optional[Post]:
+    """Publish a validated post at most once.
+
+    The post is first claimed by writing ``key`` to ``publishKey``, conditional on it being validated and
+    unclaimed, so two callers (the scheduler and a manual publish, or two processes) cannot both publish it,
+    and a restart can tell an interrupted attempt from a post that was never tried. The claim records this
+    process as ``publishOwner``, so only claims of processes that have died are recovered. Returns None when
+    the claim fails. A failed attempt releases the claim and records ``publishError``.
+
+    A scheduled publish passes the ``scheduledAt`` it is due for and only claims the post while that is
+    still set, so a sibling worker dispatching the same slot cannot retry an attempt that already failed
+    (the failure unschedules the post).
+    """
+    expect: Dict[str, Any] = {"status": "validated", "publishKey": None}
+    if scheduled_at is not None:
+        expect["scheduledAt"] = scheduled_at
+    # Store writes take a file lock and fsync, so they run in a thread
+    claimed = await asyncio.to_thread(
+        PostsStore.update_fields,
+        post_id,
+        {"publishKey": key, "publishOwner": workers.worker_id(), "publishError": None},
+        expect=expect,
+    )
+    if claimed is None:
+        return None
+    log.info("Publishing post id=%s key=%s", post_id, key)
+    try:
+        result = await publish_to_linkedin(text=claimed.text, title=claimed.title, image_url=claimed.imageUrl)
+    except Exception as e:
+        release = {"publishKey": None, "publishOwner": None, "publishError": repr(e)[:500]}
+        if scheduled_at is not None:
+            release["scheduledAt"] = None
+        await asyncio.to_thread(PostsStore.update_fields, post_id, release)
+        raise
+    now = datetime.utcnow()
+    return await asyncio.to_thread(PostsStore.update_fields, post_id, {
+        "status": "posted",
+        "postedAt": now,
+        "updatedAt": now,
+        "scheduledAt": None,
+        "publishOwner": None,
+        "linkedinPostUrl": result.get("url"),
+    })
+
+
+def schedule(post: Post) -> None:
+    """Queue a post for its ``scheduledAt`` (call after saving it). Rescheduling just pushes a new entry."""
+    if post.scheduledAt is None:
+        return
+    entry = (sort_value(post.scheduledAt), post.id)
+    if entry in _queued:
+        return
+    _queued.add(entry)
+    heapq.heappush(_heap, entry)
+    if _wake is not None:
+        _wake.set()
+
+
+def _observe(post: Post) -> None:
+    """Store listener: queue posts scheduled elsewhere, e.g. by a sibling worker, which may die before they
+    are due. Both then dispatch the post and the publish claim lets one through. Runs on any thread."""
+    loop = _loop
+    if loop is None or post.status != "validated" or post.scheduledAt is None or post.publishKey:
+        return
+    try:
+        loop.call_soon_threadsafe(schedule, post)
+    except RuntimeError:
+        # The loop closed since start()
+        pass
+
+
+def recover_claims() -> int:
+    """Release publish claims whose owner process has died, and return how many.
+
+    Such a post was mid-publish when its process stopped; it may or may not be on LinkedIn, so it is
+    unscheduled and flagged instead of being published again. Claims held by a live sibling are left alone,
+    and so are claims without an owner, since nothing says whose they are.
+    """
+    recovered = 0
+    for post in PostsStore.get_all("validated"):
+        if not post.publishKey or not post.publishOwner or workers.is_alive(post.publishOwner):
+            continue
+        released = PostsStore.update_fields(
+            post.id,
+            {"publishKey": None, "publishOwner": None, "scheduledAt": None, "publishError": INTERRUPTED},
+            expect={"publishKey": post.publishKey, "publishOwner": post.publishOwner},
+        )
+        if released is not None:
+            recovered += 1
+            log.warning("Released interrupted publish id=%s owner=%s", post.id, post.publishOwner)
+    return recovered
+
+
+def start() -> None:
+    """Recover orphaned publish claims, rebuild the due-time heap from the store and start the dispatcher on
+    the running loop. Claims of siblings that die later are recovered by the workers sweep."""
+    global _wake, _dispatcher, _loop
+    if _dispatcher is not None:
+        return
+    recover_claims()
+    workers.on_sweep(recover_claims)
+    _heap.clear()
+    _queued.clear()
+    for post in PostsStore.get_all("validated"):
+        if not post.publishKey and post.scheduledAt is not None:
+            _heap.append((sort_value(post.scheduledAt), post.id))
+    heapq.heapify(_heap)
+    _queued.update(_heap)
+    _loop = asyncio.get_running_loop()
+    PostsStore.on_change(_observe)
+    _wake = asyncio.Event()
+    _dispatcher = asyncio.get_running_loop().create_task(_dispatch(), name="scheduler")
+    log.info("Started scheduled=%d", len(_heap))
+
+
+async def stop(timeout: float = 30) -> None:
+    """Stop dispatching and give publishes already in flight up to ``timeout`` seconds to finish."""
+    global _dispatcher, _wake, _loop
+    if _dispatcher is not None:
+        _dispatcher.cancel()
+        await asyncio.gather(_dispatcher, return_exceptions=True)
+    _dispatcher = None
+    _wake = None
+    _loop = None
+    if _running:
+        await asyncio.wait(list(_running), timeout=timeout)
+
+
+async def _dispatch() -> None:
+    assert _wake is not None
+    wake = _wake
+    limit = asyncio.Semaphore(max(1, settings.scheduler_concurrency))
+    while True:
+        wake.clear()
+        now = datetime.utcnow()
+        while _heap and _heap[0][0] <= now:
+            due, post_id = heapq.heappop(_heap)
+            _queued.discard((due, post_id))
+            task = asyncio.get_running_loop().create_task(_fire(post_id, due, limit), name=f"scheduled:{post_id}")
+            _running.add(task)
+            task.add_done_callback(_running.discard)
+        delay = (_heap[0][0] - datetime.utcnow()).total_seconds() if _heap else None
+        try:
+            await asyncio.wait_for(wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _fire(post_id: str, due: datetime, limit: asyncio.Semaphore) -> None:
+    # Taken here rather than by the dispatcher, so a task cancelled before it runs holds no permit
+    async with limit:
+        # stop() was called while this waited for a permit: leave the post for the next start
+        if _dispatcher is None:
+            return
+        try:
+            post = PostsStore.get_by_id(post_id)
+            # Skip entries made stale by a reschedule, cancellation, deletion or manual publish
+            if post is None or post.status != "validated" or post.scheduledAt is None or sort_value(post.scheduledAt) != due:
+                return
+            # Same key for the same post and due time, so the claim doubles as an idempotency key for this slot
+            if await publish_post(post_id, f"schedule:{post_id}:{due.isoformat()}", scheduled_at=post.scheduledAt) is None:
+                log.info("Post id=%s already claimed; skipping", post_id)
+        except Exception as e:
+            log.warning("Scheduled publish failed id=%s: %r", post_id, e)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+import functools
+import math
+import re
+import threading
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..config import settings
+from ..db.store import PostsStore
+from ..models import Post
+from ..log import get_logger
+
+log = get_logger("similarity")
+
+NUM_PERM = 48
+# 16 bands of 3 rows: two ideas with Jaccard similarity s become candidates with probability
+# 1 - (1 - s**3)**16, which is 98% at IDEA_DUP_THRESHOLD's default of 0.6 and about 50% at s = 0.35;
+# 2-row bands would put the 50% point near 0.2 and fill buckets with unrelated ideas
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Mersenne prime for the universal hash family; (a * h + b) stays below 2**63 for 32-bit h
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240620)
+_A = _rng.integers(1, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+# Mixes the hashes of two adjacent words into the hash of the bigram
+_BIGRAM = np.uint64(0x9E3779B1)
+_MASK32 = np.uint64(0xFFFFFFFF)
+# Posts hashed together while building the index; bounds the temporary (NUM_PERM, shingles) array
+_BUILD_BATCH = 2048
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from how in into is it its of on or so than that the their this to was "
+    "we what when why with you your our can will not do does".split()
+)
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS]
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _token_hashes(text: str) -> np.ndarray:
+    """Hashes of the text's words, in order."""
+    toks = _tokens(text)
+    return np.fromiter((_hash(t) for t in toks), dtype=np.uint64, count=len(toks))
+
+
+def _shingles_of(toks: np.ndarray) -> np.ndarray:
+    # Bigram hashes are computed from the word hashes, so no bigram string is ever built
+    bigrams = (toks[:-1] * _BIGRAM + toks[1:]) & _MASK32
+    return np.unique(np.concatenate([toks, bigrams]))
+
+
+def shingles(text: str) -> np.ndarray:
+    """Hashed word unigrams and bigrams of the text."""
+    return _shingles_of(_token_hashes(text))
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) of the text's shingle set."""
+    return _signature(shingles(text))
+
+
+def _signature(hashes: np.ndarray) -> np.ndarray:
+    if hashes.size == 0:
+        return np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    mixed = (np.outer(_A, hashes) + _B[:, None]) % _PRIME
+    return mixed.min(axis=1).astype(np.uint32)
+
+
+def _signatures(shingle_sets: List[np.ndarray]) -> np.ndarray:
+    """_signature() of many shingle sets at once: one (len, NUM_PERM) array, hashed in a single pass."""
+    out = np.full((len(shingle_sets), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    filled = [i for i, h in enumerate(shingle_sets) if h.size]
+    if filled:
+        sizes = np.array([shingle_sets[i].size for i in filled])
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        mixed = (np.outer(_A, np.concatenate([shingle_sets[i] for i in filled])) + _B[:, None]) % _PRIME
+        out[filled] = np.minimum.reduceat(mixed, starts, axis=1).T.astype(np.uint32)
+    return out
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def idea_text(idea: Optional[str], title: Optional[str]) -> str:
+    """The text that identifies a post for dedup: its idea and title (the body is too long to compare by overlap)."""
+    return f"{idea or ''} {title or ''}".strip()
+
+
+class IdeaIndex:
+    """In-memory near-duplicate index over post ideas and titles.
+
+    Each post gets a MinHash signature, stored as a row of a NumPy array and
+    bucketed by locality-sensitive hashing (BANDS bands of ROWS values), so a
+    near-duplicate lookup only scores the few posts sharing a band. A token
+    inverted index ranks prior ideas by IDF-weighted overlap with a free-text
+    query such as a topic. Rows are append-only; an edited post gets a new
+    row and its old row is marked dead.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._built = False
+        self._sigs = np.zeros((1024, NUM_PERM), dtype=np.uint32)
+        # Per row: False once the post was edited (it has a newer row) or never held one
+        self._alive = np.zeros(1024, dtype=bool)
+        self._row_ids: List[Optional[str]] = []
+        self._row_ideas: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: Dict[str, str] = {}
+        self._bands: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(BANDS)]
+        self._postings: Dict[int, array] = {}
+        # (query, k) -> prompt_ideas() result; cleared whenever a row is added
+        self._prompt_cache: Dict[Tuple[Optional[str], int], List[str]] = {}
+
+    def build(self) -> None:
+        with self._lock:
+            if self._built:
+                return
+            # Oldest first, so row order follows recency
+            posts = list(reversed(PostsStore.get_all()))
+            for start in range(0, len(posts), _BUILD_BATCH):
+                self._add_many(posts[start:start + _BUILD_BATCH])
+            self._built = True
+            log.info("Indexed ideas count=%d", len(self._rows))
+
+    def observe(self, post: Post) -> None:
+        """Store listener: index new posts and re-index ones whose idea or title changed."""
+        with self._lock:
+            if self._built:
+                self._add(post)
+
+    def _add(self, post: Post) -> None:
+        self._add_many([post])
+
+    def _add_many(self, posts: List[Post]) -> None:
+        """Index new posts and re-index edited ones; signatures and band keys are computed for the batch."""
+        todo: List[Tuple[Post, str, np.ndarray]] = []
+        for post in posts:
+            text = idea_text(post.idea, post.title)
+            if text and self._texts.get(post.id) != text:
+                todo.append((post, text, _token_hashes(text)))
+        if not todo:
+            return
+        sigs = _signatures([_shingles_of(toks) for _, _, toks in todo])
+        keys = self._band_keys(sigs)
+        first = len(self._row_ids)
+        while first + len(todo) > len(self._sigs):
+            self._sigs = np.concatenate([self._sigs, np.zeros_like(self._sigs)])
+            self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+        self._sigs[first:first + len(todo)] = sigs
+        self._alive[first:first + len(todo)] = True
+        self._prompt_cache.clear()
+        postings = self._postings
+        for row, (post, text, toks) in enumerate(todo, first):
+            old = self._rows.get(post.id)
+            if old is not None:
+                self._row_ids[old] = None
+                self._alive[old] = False
+            self._row_ids.append(post.id)
+            self._row_ideas.append(post.idea or post.title)
+            self._rows[post.id] = row
+            self._texts[post.id] = text
+            for h in set(toks.tolist()):
+                postings.setdefault(h, array("I")).append(row)
+        for buckets, band_keys in zip(self._bands, keys):
+            for row, key in enumerate(band_keys, first):
+                buckets[key].append(row)
+
+    @staticmethod
+    def _band_keys(sigs: np.ndarray) -> List[List[bytes]]:
+        """Per band, the bucket key of each signature (rows of ``sigs``)."""
+        key_type = np.dtype((np.void, ROWS * sigs.itemsize))
+        return [
+            np.ascontiguousarray(sigs[:, band * ROWS:(band + 1) * ROWS]).view(key_type).ravel().tolist()
+            for band in range(BANDS)
+        ]
+
+    def near_duplicates(self, text: str, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Posts whose idea/title is estimated at least ``threshold`` similar to ``text``, most similar first."""
+        self.build()
+        threshold = settings.idea_dup_threshold if threshold is None else threshold
+        sig = signature(text)
+        with self._lock:
+            candidates = set()
+            for band, (key,) in enumerate(self._band_keys(sig[None, :])):
+                candidates.update(self._bands[band].get(key, ()))
+            rows = [r for r in candidates if self._row_ids[r] is not None]
+            if not rows:
+                return []
+            scores = np.count_nonzero(self._sigs[rows] == sig, axis=1) / NUM_PERM
+            hits = [(self._row_ids[r], float(s)) for r, s in zip(rows, scores) if s >= threshold]
+        return sorted(hits, key=lambda h: h[1], reverse=True)  # type: ignore[arg-type, return-value]
+
+    def related(self, query: str, k: int, max_candidates: int = 2000) -> List[str]:
+        """Up to ``k`` prior ideas ranked by IDF-weighted token overlap with ``query``.
+
+        Rarest query tokens are scanned first and scanning stops after ``max_candidates``
+        postings (the newest of each list), so common words cannot make a lookup scan the
+        whole archive. Scores are summed with NumPy rather than per posting.
+        """
+        self.build()
+        with self._lock:
+            total = max(1, len(self._rows))
+            lists = [self._postings[h] for h in {_hash(t) for t in _tokens(query)} if h in self._postings]
+            rows_parts: List[np.ndarray] = []
+            weight_parts: List[np.ndarray] = []
+            scanned = 0
+            for postings in sorted(lists, key=len):
+                if scanned >= max_candidates:
+                    break
+                rows = np.frombuffer(postings[-(max_candidates - scanned):], dtype=np.uint32)
+                rows_parts.append(rows)
+                weight_parts.append(np.full(rows.size, math.log(1 + total / len(postings))))
+                scanned += len(postings)
+            if not rows_parts:
+                return []
+            rows = np.concatenate(rows_parts)
+            weights = np.concatenate(weight_parts)
+            live = self._alive[rows]
+            candidates, inverse = np.unique(rows[live], return_inverse=True)
+            scores = np.bincount(inverse, weights=weights[live], minlength=candidates.size)
+            # Highest score first, newer rows first among equal scores
+            ranked = np.lexsort((candidates, scores))[::-1][:k]
+            return [self._row_ideas[r] for r in candidates[ranked].tolist()]
+
+    def recent(self, k: int) -> List[str]:
+        """The ``k`` most recently indexed ideas."""
+        self.build()
+        with self._lock:
+            out: List[str] = []
+            for row in range(len(self._row_ids) - 1, -1, -1):
+                if len(out) >= k:
+                    break
+                if self._row_ids[row] is not None:
+                    out.append(self._row_ideas[row])
+            return out
+
+    def prompt_ideas(self, query: Optional[str], k: Optional[int] = None) -> List[str]:
+        """Prior ideas worth showing the model as "already used": the ones most related to the query,
+        topped up with the most recent ones. Results are kept until the index changes, since the same
+        few buckets and topics are asked for again and again."""
+        k = settings.idea_prompt_top_k if k is None else k
+        self.build()
+        with self._lock:
+            cached = self._prompt_cache.get((query, k))
+            if cached is not None:
+                return list(cached)
+            ideas = self.related(query, k) if query else []
+            if len(ideas) < k:
+                seen = set(ideas)
+                ideas += [i for i in self.recent(k) if i not in seen][: k - len(ideas)]
+            if len(self._prompt_cache) >= 256:
+                self._prompt_cache.clear()
+            self._prompt_cache[(query, k)] = ideas
+            return list(ideas)
+
+idea_index = IdeaIndex()
+PostsStore.on_change(idea_index.observe)
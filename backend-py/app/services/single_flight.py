@@ -0,0 +1,81 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from ..config import settings
+from ..log import get_logger
+
+log = get_logger("single_flight")
+
+
+def prompt_key(function: str, model: str, payload: Any) -> str:
+    """Cache key for a paid call: the function, the model and a hash of the exact request payload."""
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{function}:{model}:{digest}"
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one and remembers results for a short time.
+
+    The first caller for a key starts the call; callers arriving while it is in
+    flight await the same task, and callers within ``ttl`` seconds after it
+    succeeds get the stored result. Failures are not cached, so the next caller
+    retries. The shared task is shielded: a caller that goes away (e.g. a client
+    disconnect) does not cancel the call for the others.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._stats = {"calls": 0, "coalesced": 0, "cacheHits": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._results[key] = (time.monotonic() + self.ttl, value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self.get(key)
+        if cached is not None:
+            self._stats["cacheHits"] += 1
+            log.debug("Cache hit key=%.48s", key)
+            return cached
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            log.debug("Joined in-flight call key=%.48s", key)
+        else:
+            self._stats["calls"] += 1
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._settle(key, t))
+        return await asyncio.shield(task)
+
+    def _settle(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "inflight": len(self._inflight), "entries": len(self._results)}
+
+
+prompt_cache = SingleFlight(ttl=settings.prompt_cache_ttl_s, max_entries=settings.prompt_cache_max_entries)
@@ -0,0 +1,204 @@
+"""Startup warm-up and the readiness state behind GET /ready.
+
+start() returns at once and warms up in the background, in parallel:
+loading the store (then building the idea index and starting the scheduler),
+importing LangChain/LangGraph and compiling the agent, and opening keep-alive
+connections to every provider with credentials. The process is ready once
+every component has finished and none of the required ones failed; optional
+ones (agent, connection pools) only make the first requests faster.
+"""
+from __future__ import annotations
+import asyncio
+import importlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .. import metrics
+from ..config import settings
+from ..db.store import AuthStore, PostsStore
+from . import agent, http, scheduler
+from .similarity import idea_index
+from ..log import get_logger
+
+log = get_logger("warmup")
+
+# What the agent imports on first use, timed one by one so the report shows which is slow
+AGENT_IMPORTS = ("langchain_core.messages", "langchain_core.tools", "langchain_anthropic", "langgraph.prebuilt")
+
+FINISHED = ("ready", "skipped", "failed")
+
+
+class Skipped(Exception):
+    """Raised by a warm-up step that does not apply to this configuration; the message says why."""
+
+
+class Component:
+    __slots__ = ("name", "required", "state", "seconds", "detail")
+
+    def __init__(self, name: str, required: bool) -> None:
+        self.name = name
+        self.required = required
+        # pending -> warming -> ready | skipped | failed
+        self.state = "pending"
+        self.seconds: Optional[float] = None
+        self.detail: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "state": self.state,
+            "required": self.required,
+            "ms": round(self.seconds * 1000, 1) if self.seconds is not None else None,
+        }
+        if self.detail:
+            out["detail"] = self.detail
+        return out
+
+
+_components: Dict[str, Component] = {}
+# Module -> import time in ms: the app itself, plus the agent's deferred imports once warmed
+_imports: Dict[str, float] = {}
+_task: Optional["asyncio.Task[None]"] = None
+_started = 0.0
+_elapsed: Optional[float] = None
+
+
+def record_import(module: str, seconds: float) -> None:
+    _imports[module] = round(seconds * 1000, 1)
+
+
+async def _run(component: Component, step: Callable[[], Awaitable[Optional[str]]]) -> bool:
+    """Run one step, recording its state and duration (also as the ``warmup.<name>`` span). True if it succeeded."""
+    component.state = "warming"
+    started = time.perf_counter()
+    try:
+        component.detail = await step()
+        component.state = "ready"
+    except Skipped as e:
+        component.detail = str(e)
+        component.state = "skipped"
+    except Exception as e:
+        component.detail = repr(e)
+        component.state = "failed"
+        log.warning("Warm-up of %s failed: %r", component.name, e)
+    finally:
+        component.seconds = time.perf_counter() - started
+        metrics.record(f"warmup.{component.name}", component.seconds)
+    log.info("Warm-up %s %s in %.0fms", component.name, component.state, component.seconds * 1000)
+    return component.state == "ready"
+
+
+async def _load_store() -> None:
+    await asyncio.to_thread(PostsStore.load)
+
+
+async def _build_ideas() -> None:
+    await asyncio.to_thread(idea_index.build)
+
+
+async def _start_scheduler() -> None:
+    # Reads the store, so it waits for the load instead of doing it on the event loop
+    scheduler.start()
+
+
+def _compile_agent() -> None:
+    if not settings.agent_warmup:
+        raise Skipped("AGENT_WARMUP is off")
+    if not settings.anthropic_api_key:
+        raise Skipped("ANTHROPIC_API_KEY is not set")
+    for module in AGENT_IMPORTS:
+        started = time.perf_counter()
+        importlib.import_module(module)
+        record_import(module, time.perf_counter() - started)
+    if not agent.warm_up():
+        raise RuntimeError("agent build failed; requests will use the direct generator")
+
+
+async def _warm_agent() -> None:
+    # Heavy imports and graph compilation; keep them off the event loop
+    await asyncio.to_thread(_compile_agent)
+
+
+def _credentialed_providers() -> List[str]:
+    """Providers the app will actually call with the current credentials."""
+    names = []
+    if settings.anthropic_api_key:
+        names.append("anthropic")
+    if settings.perplexity_api_key:
+        names.append("perplexity")
+    if settings.openai_api_key:
+        names.append("openai")
+    if settings.linkedin.access_token or AuthStore.get_linkedin().get("accessToken"):
+        names.append("linkedin")
+    return names
+
+
+def _preconnect(provider: str) -> Callable[[], Awaitable[str]]:
+    async def step() -> str:
+        opened = await http.preconnect(provider, settings.warmup_connections)
+        if not opened:
+            raise RuntimeError(f"no response from {getattr(settings.providers, provider).base_url}")
+        return f"{opened} connection(s)"
+    return step
+
+
+async def _warm_up(pools: List[str]) -> None:
+    global _elapsed
+
+    async def store_chain() -> None:
+        if await _run(_components["store"], _load_store):
+            await asyncio.gather(
+                _run(_components["ideas"], _build_ideas),
+                _run(_components["scheduler"], _start_scheduler),
+            )
+        else:
+            for name in ("ideas", "scheduler"):
+                _components[name].state = "failed"
+                _components[name].detail = "store failed to load"
+
+    await asyncio.gather(
+        store_chain(),
+        _run(_components["agent"], _warm_agent),
+        *(_run(_components[f"pool.{p}"], _preconnect(p)) for p in pools),
+    )
+    _elapsed = time.perf_counter() - _started
+    log.info("Warm-up finished in %.0fms ready=%s", _elapsed * 1000, is_ready())
+
+
+def start() -> None:
+    """Start warming up on the running loop and return immediately; /ready reports progress."""
+    global _task, _started, _elapsed
+    if _task is not None:
+        return
+    _components.clear()
+    for name in ("store", "ideas", "scheduler"):
+        _components[name] = Component(name, required=True)
+    _components["agent"] = Component("agent", required=False)
+    pools = _credentialed_providers() if settings.warmup_connections > 0 else []
+    for provider in pools:
+        _components[f"pool.{provider}"] = Component(f"pool.{provider}", required=False)
+    _started, _elapsed = time.perf_counter(), None
+    _task = asyncio.get_running_loop().create_task(_warm_up(pools), name="warm-up")
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+    _task = None
+
+
+def is_ready() -> bool:
+    components = list(_components.values())
+    return bool(components) and all(
+        c.state in FINISHED and not (c.required and c.state == "failed") for c in components
+    )
+
+
+def status() -> Dict[str, Any]:
+    """Readiness, each component's state and warm-up time, and the recorded import times."""
+    return {
+        "ready": is_ready(),
+        "warmupMs": round(_elapsed * 1000, 1) if _elapsed is not None else None,
+        "components": {name: c.as_dict() for name, c in _components.items()},
+        "importsMs": dict(_imports),
+    }
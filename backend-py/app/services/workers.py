@@ -0,0 +1,133 @@
+"""Identity and liveness of the server processes sharing DATA_DIR.
+
+Each process has an id (host, pid and a random boot token) and, once
+started, a thread that touches ``DATA_DIR/workers/<id>.alive`` every few
+seconds. Work a process claims (a publish, a job) records that id, so
+recovery can tell a claim held by a live sibling (``uvicorn --workers N``)
+from one left behind by a process that died: only owners whose heartbeat
+is older than WORKER_LEASE_S count as gone. Owners recover at their own
+start and register the same callback with ``on_sweep``, which runs it once
+per lease, so a sibling that dies is cleaned up without waiting for a
+restart.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from ..config import settings
+from ..db.store import DATA_DIR
+from ..log import get_logger
+
+log = get_logger("workers")
+
+HEARTBEAT_DIR = DATA_DIR / "workers"
+
+# (pid, id): recomputed after a fork so a child never reuses its parent's id
+_id: Optional[Tuple[int, str]] = None
+_sweeps: List[Callable[[], None]] = []
+_stop = threading.Event()
+_beater: Optional[threading.Thread] = None
+_sweeper: Optional["asyncio.Task[None]"] = None
+
+
+def worker_id() -> str:
+    global _id
+    pid = os.getpid()
+    if _id is None or _id[0] != pid:
+        _id = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _id[1]
+
+
+def _path(owner: str) -> Path:
+    return HEARTBEAT_DIR / (owner.replace(":", "_").replace("/", "_") + ".alive")
+
+
+def beat() -> None:
+    HEARTBEAT_DIR.mkdir(parents=True, exist_ok=True)
+    _path(worker_id()).touch()
+
+
+def is_alive(owner: Optional[str]) -> bool:
+    """Whether the process that recorded ``owner`` has sent a heartbeat within the lease (False without one)."""
+    if not owner:
+        return False
+    if owner == worker_id():
+        return True
+    try:
+        age = time.time() - _path(owner).stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return age < settings.worker_lease_s
+
+
+def on_sweep(recover: Callable[[], None]) -> None:
+    """Run ``recover`` once per lease, in a worker thread, to release claims of processes that have died."""
+    if recover not in _sweeps:
+        _sweeps.append(recover)
+
+
+def _beat_loop(stop: threading.Event) -> None:
+    # A thread rather than a task, so a busy event loop cannot make a live process look dead
+    interval = max(0.5, settings.worker_lease_s / 6)
+    while not stop.wait(interval):
+        try:
+            beat()
+        except OSError as e:
+            log.warning("Heartbeat failed: %r", e)
+
+
+def _prune() -> None:
+    """Drop heartbeat files of processes long gone."""
+    cutoff = time.time() - 10 * settings.worker_lease_s
+    for path in HEARTBEAT_DIR.glob("*.alive"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _sweep() -> None:
+    for recover in _sweeps:
+        try:
+            recover()
+        except Exception as e:
+            log.exception("Recovery sweep %r failed: %r", recover, e)
+
+
+async def _sweep_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.worker_lease_s)
+        # Recovery reads and writes the stores under their file locks
+        await asyncio.to_thread(_sweep)
+
+
+def start() -> None:
+    """Announce this process, start the heartbeat thread and the periodic sweep on the running loop."""
+    global _beater, _sweeper
+    if _beater is not None and _beater.is_alive():
+        return
+    beat()
+    _prune()
+    _stop.clear()
+    _beater = threading.Thread(target=_beat_loop, args=(_stop,), name="worker-heartbeat", daemon=True)
+    _beater.start()
+    _sweeper = asyncio.get_running_loop().create_task(_sweep_loop(), name="worker-sweep")
+    log.info("Worker id=%s started", worker_id())
+
+
+async def stop() -> None:
+    """Stop heartbeating and withdraw the heartbeat file, so siblings recover this process's claims at once."""
+    global _beater, _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        await asyncio.gather(_sweeper, return_exceptions=True)
+        _sweeper = None
+    _stop.set()
+    _beater = None
+    _path(worker_id()).unlink(missing_ok=True)
@@ -0,0 +1,285 @@
+"""Storage and serialization micro-benchmarks for PostsStore at several corpus sizes.
+
+Usage (from backend-py/):
+    python benchmarks/bench_store.py [--sizes 1000,10000,100000] [--driver json|sqlite]
+                                     [--seconds 2] [--save results.json] [--compare baseline.json]
+
+Each size runs in a fresh subprocess against a synthetic corpus in a temporary
+DATA_DIR, so peak RSS is per corpus and nothing touches data/. Posts have
+realistic shapes: ~300-word text, mixed statuses, ideas spread over the content
+buckets, timestamps over the last year. Reported per operation: ops/s, p50 and
+p99 latency in milliseconds; per size: corpus bytes and peak RSS.
+
+``--save`` writes the results as JSON. ``--compare`` reruns against such a file
+and exits with status 1 when any p50 (or the peak RSS) is more than
+``--tolerance`` worse, which is the regression gate to run before and after a
+storage change. Baselines are only comparable on the same machine.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+# Upper bound on timed upserts / updates per size; their inputs are generated before timing starts
+WRITE_RUNS = 5_000
+# (status, share of the corpus)
+STATUS_MIX = (("draft", 0.55), ("validated", 0.2), ("posted", 0.2), ("deleted", 0.05))
+WORDS = (
+    "data model pipeline team metric signal product customer latency experiment feature insight cost "
+    "quality churn growth forecast dashboard warehouse analyst engineer decision tradeoff baseline "
+    "evidence outcome process review deploy monitor incident learning systems simple focus"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    sentences: List[str] = []
+    remaining = words
+    while remaining > 0:
+        n = min(remaining, rng.randint(8, 18))
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + ".")
+        remaining -= n
+    return " ".join(sentences)
+
+
+def synthetic_post(rng: random.Random, index: int, now: datetime) -> Dict[str, Any]:
+    from app.models import BUCKETS
+
+    status = rng.choices([s for s, _ in STATUS_MIX], weights=[w for _, w in STATUS_MIX])[0]
+    created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+    updated = created + timedelta(seconds=rng.randint(0, 7 * 24 * 3600))
+    bucket = rng.choice(BUCKETS)
+    post: Dict[str, Any] = {
+        "id": f"bench-{index:08d}",
+        "name": bucket,
+        "idea": f"{bucket}: {_text(rng, 12)}",
+        "title": _text(rng, 8).rstrip("."),
+        "text": _text(rng, 300),
+        "imageUrl": f"https://picsum.photos/seed/bench-{index}/800/450",
+        "imagePrompt": _text(rng, 20),
+        "imageStatus": "ready",
+        "status": status,
+        "createdAt": created.isoformat(),
+        "updatedAt": updated.isoformat(),
+    }
+    if status in ("validated", "posted"):
+        post["validatedAt"] = updated.isoformat()
+    if status == "posted":
+        post["postedAt"] = updated.isoformat()
+        post["linkedinPostUrl"] = f"https://www.linkedin.com/feed/update/urn:li:activity:{index}"
+    if status == "deleted":
+        post["deletedAt"] = updated.isoformat()
+    return post
+
+
+def write_corpus(data_dir: Path, size: int, seed: int) -> int:
+    """Write a newest-first posts.json like the store's own snapshot. Returns its size in bytes."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    posts = [synthetic_post(rng, i, now) for i in range(size)]
+    posts.sort(key=lambda p: p["createdAt"], reverse=True)
+    path = data_dir / "posts.json"
+    path.write_text(json.dumps(posts, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return path.stat().st_size
+
+
+def measure(fn: Callable[[], Any], *, seconds: float, min_runs: int = 5, max_runs: int = 20_000) -> Dict[str, float]:
+    """Call ``fn`` until ``seconds`` have passed (within [min_runs, max_runs]); return ops/s, p50 and p99 in ms."""
+    samples: List[float] = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "runs": len(samples),
+        "opsPerSec": round(len(samples) / total, 1) if total else 0.0,
+        "p50Ms": round(samples[len(samples) // 2] * 1000, 4),
+        "p99Ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 4),
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_worker(size: int, seconds: float, seed: int) -> Dict[str, Any]:
+    """Benchmark one corpus size. Runs in its own process with DATA_DIR and STORE_DRIVER already set."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    data_dir = Path(os.environ["DATA_DIR"])
+    corpus_bytes = write_corpus(data_dir, size, seed)
+    if os.environ.get("STORE_DRIVER", "json").lower() == "sqlite":
+        # store before migrate: with STORE_DRIVER=sqlite, store imports sqlite_store while opening its engines
+        from app.db.store import SQLITE_PATH
+        from app.db.migrate import migrate
+
+        migrate(SQLITE_PATH)
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+    from app.db.store import PostsStore
+    from app.main import app
+    from app.models import Post
+    from app.routers.posts import list_posts
+    from starlette.responses import Response
+
+    results: Dict[str, Any] = {"size": size, "corpusBytes": corpus_bytes}
+    started = time.perf_counter()
+    PostsStore.load()
+    results["loadMs"] = round((time.perf_counter() - started) * 1000, 1)
+
+    rng = random.Random(seed + 1)
+    ids = [p.id for p in PostsStore.get_all()]
+    ops: Dict[str, Dict[str, float]] = {}
+    ops["get_all"] = measure(lambda: PostsStore.get_all(), seconds=seconds)
+    ops["get_all(status=validated)"] = measure(lambda: PostsStore.get_all("validated"), seconds=seconds)
+    ops["get_by_id"] = measure(lambda: PostsStore.get_by_id(rng.choice(ids)), seconds=seconds)
+    ops["get_page(limit=50)"] = measure(lambda: PostsStore.get_page(limit=50), seconds=seconds)
+
+    # Inputs are built up front so only the store call is timed
+    now = datetime.utcnow()
+    new_posts = iter([Post(**synthetic_post(rng, size + i, now)) for i in range(WRITE_RUNS)])
+    ops["upsert"] = measure(lambda: PostsStore.upsert(next(new_posts)), seconds=seconds, max_runs=WRITE_RUNS)
+    patches = iter([(rng.choice(ids), {"title": _text(rng, 8)}) for _ in range(WRITE_RUNS)])
+    ops["update_fields"] = measure(lambda: PostsStore.update_fields(*next(patches)), seconds=seconds, max_runs=WRITE_RUNS)
+
+    # The list_posts handler plus FastAPI's default encoding of its result (if it did not return a Response)
+    def serialize(**query: Any) -> Callable[[], bytes]:
+        params = {"status": None, "limit": None, "cursor": None, "fields": None, "sort": None, "order": "desc", **query}
+
+        def run() -> bytes:
+            result = list_posts(**params)
+            if isinstance(result, Response):
+                return result.body
+            return JSONResponse(jsonable_encoder(result)).body
+        return run
+
+    ops["list_posts serialize"] = measure(serialize(), seconds=seconds, min_runs=3)
+    ops["list_posts serialize(status=validated)"] = measure(serialize(status="validated"), seconds=seconds, min_runs=3)
+    ops["list_posts serialize(limit=50)"] = measure(serialize(limit=50), seconds=seconds)
+
+    # The same listing end to end through the app: routing, middleware and the configured response class
+    client = TestClient(app)
+    ops["GET /posts"] = measure(lambda: client.get("/posts").raise_for_status(), seconds=seconds, min_runs=3)
+    ops["GET /posts?limit=50"] = measure(lambda: client.get("/posts?limit=50").raise_for_status(), seconds=seconds)
+
+    PostsStore.compact()
+    results["ops"] = ops
+    results["peakRssMb"] = peak_rss_mb()
+    return results
+
+
+def run_size(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix=f"bench-store-{size}-") as tmp:
+        env = {
+            **os.environ,
+            "DATA_DIR": tmp,
+            "STORE_DRIVER": args.driver,
+            "SQLITE_PATH": "",
+            "LOG_LEVEL": "WARNING",
+            "ANTHROPIC_API_KEY": "",
+            "API_KEY": "",
+        }
+        cmd = [sys.executable, str(Path(__file__).resolve()), "--worker", str(size), "--seconds", str(args.seconds), "--seed", str(args.seed)]
+        out = subprocess.run(cmd, env=env, cwd=BACKEND_DIR, check=True, stdout=subprocess.PIPE, text=True).stdout
+    # The worker prints its result as the last line; anything before it is app output
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for size, result in report["results"].items():
+        print(f"\n== {int(size):,} posts  corpus={result['corpusBytes'] / 1e6:.1f} MB  load={result['loadMs']:.0f} ms  peak RSS={result['peakRssMb']:.0f} MB")
+        print(f"{'operation':<42}{'ops/s':>12}{'p50 ms':>12}{'p99 ms':>12}")
+        for name, op in result["ops"].items():
+            print(f"{name:<42}{op['opsPerSec']:>12,.1f}{op['p50Ms']:>12.3f}{op['p99Ms']:>12.3f}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressions of p50 latency or peak RSS beyond ``tolerance`` (0.25 = 25% worse) against the baseline.
+
+    Latency changes smaller than ``min_delta_ms`` are ignored; for sub-microsecond-scale operations they are noise.
+    """
+    failures: List[str] = []
+    for size, result in report["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if base is None:
+            continue
+        for name, op in result["ops"].items():
+            base_op = base["ops"].get(name)
+            if not base_op or op["p50Ms"] - base_op["p50Ms"] < min_delta_ms:
+                continue
+            if op["p50Ms"] > base_op["p50Ms"] * (1 + tolerance):
+                failures.append(f"{size} posts, {name}: p50 {base_op['p50Ms']:.3f} -> {op['p50Ms']:.3f} ms")
+        if result["peakRssMb"] > base["peakRssMb"] * (1 + tolerance):
+            failures.append(f"{size} posts: peak RSS {base['peakRssMb']:.0f} -> {result['peakRssMb']:.0f} MB")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PostsStore and list serialization on synthetic corpora.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma-separated corpus sizes")
+    parser.add_argument("--driver", choices=("json", "sqlite"), default="json", help="STORE_DRIVER to benchmark")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time budget per operation")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed; keep it fixed when comparing runs")
+    parser.add_argument("--save", help="Write the results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--compare", help="Baseline JSON to gate against; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before --compare fails (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore p50 changes smaller than this")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.seconds, args.seed)))
+        return
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "driver": args.driver,
+            "seed": args.seed,
+            "seconds": args.seconds,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "createdAt": datetime.utcnow().isoformat() + "Z",
+        },
+        "results": {},
+    }
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        print(f"Benchmarking {size:,} posts ({args.driver})...", file=sys.stderr)
+        report["results"][str(size)] = run_size(size, args)
+    print_report(report)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nSaved results to {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("meta", {}).get("driver") != args.driver:
+            print(f"\nWarning: baseline was recorded with driver {baseline.get('meta', {}).get('driver')!r}", file=sys.stderr)
+        failures = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if failures:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for line in failures:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
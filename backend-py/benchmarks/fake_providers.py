@@ -0,0 +1,295 @@
+"""Local stand-ins for the Anthropic, Perplexity, OpenAI and LinkedIn APIs, for load tests without network.
+
+Usage (from backend-py/):
+    python benchmarks/fake_providers.py [--port 9100] [--latency-scale 1.0]
+        [--error-rate 0.0] [--rate-limit-rate 0.0]
+        [--provider anthropic:median_ms=1200,sigma=0.4,error_rate=0.02,rate_limit_rate=0.01 ...]
+
+One server answers every provider's paths. Point the app at it with:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:9100 PERPLEXITY_BASE_URL=http://127.0.0.1:9100 \\
+    OPENAI_BASE_URL=http://127.0.0.1:9100 LINKEDIN_BASE_URL=http://127.0.0.1:9100 \\
+    LINKEDIN_OAUTH_BASE_URL=http://127.0.0.1:9100 \\
+    ANTHROPIC_API_KEY=fake PERPLEXITY_API_KEY=fake OPENAI_API_KEY=fake \\
+    LINKEDIN_ACCESS_TOKEN=fake LINKEDIN_AUTHOR_URN=urn:li:person:fake
+
+Latency is log-normal around each provider's median (``sigma`` sets the tail).
+Each call fails with 429 or a 5xx at the configured rates. Streaming Anthropic
+calls send server-sent events token by token. GET /_stats returns per-provider
+call counts by outcome.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import math
+import random
+import sys
+import uuid
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+WORDS = (
+    "data model pipeline team metric signal product customer latency experiment feature insight cost quality "
+    "churn growth forecast dashboard warehouse analyst engineer decision tradeoff baseline evidence outcome"
+).split()
+BUCKETS = ("Timeless principle", "Case study", "Growth hack", "Controversial topic")
+
+
+@dataclass
+class Profile:
+    median_ms: float
+    sigma: float = 0.4
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Streaming only: delay between tokens
+    token_ms: float = 0.0
+
+
+DEFAULT_PROFILES: Dict[str, Profile] = {
+    "anthropic": Profile(median_ms=1200, sigma=0.4, token_ms=15),
+    "perplexity": Profile(median_ms=2500, sigma=0.5),
+    "openai": Profile(median_ms=8000, sigma=0.3),
+    "linkedin": Profile(median_ms=300, sigma=0.3),
+    "assets": Profile(median_ms=40, sigma=0.3),
+}
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _image_bytes() -> bytes:
+    """A 1792x1024 noisy JPEG (about the size of a real generation), or a 1x1 PNG without Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return bytes.fromhex(
+            "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+            "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+        )
+    img = Image.effect_noise((1792, 1024), 64).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def create_app(profiles: Dict[str, Profile], latency_scale: float = 1.0, seed: Optional[int] = None) -> FastAPI:
+    app = FastAPI(title="Fake providers")
+    rng = random.Random(seed)
+    stats: Counter = Counter()
+    image = _image_bytes()
+    ids = itertools.count(1)
+
+    def latency(provider: str) -> float:
+        p = profiles[provider]
+        return random.lognormvariate(math.log(max(p.median_ms, 0.001)), p.sigma) * latency_scale / 1000
+
+    async def failure(provider: str) -> Optional[Response]:
+        """Roll for an injected 429/5xx; failures come back after a fraction of the usual latency."""
+        p = profiles[provider]
+        roll = rng.random()
+        if roll < p.rate_limit_rate:
+            stats[(provider, "429")] += 1
+            await asyncio.sleep(latency(provider) * 0.1)
+            return JSONResponse({"error": {"type": "rate_limit_error"}}, status_code=429, headers={"retry-after": "1"})
+        if roll < p.rate_limit_rate + p.error_rate:
+            status = rng.choice((500, 502, 503))
+            stats[(provider, str(status))] += 1
+            await asyncio.sleep(latency(provider) * 0.1)
+            return JSONResponse({"error": {"type": "api_error"}}, status_code=status)
+        stats[(provider, "ok")] += 1
+        return None
+
+    def idea_json(prompt: str) -> Dict[str, str]:
+        bucket = next((b for b in BUCKETS if f"content category: {b}" in prompt or f"Target bucket: {b}" in prompt), rng.choice(BUCKETS))
+        # Random words keep ideas distinct, so the app's near-duplicate check does not trigger regeneration
+        return {
+            "name": _words(rng, 4).title(),
+            "idea": f"{bucket}: {_words(rng, 14)}",
+            "title": _words(rng, 8).capitalize(),
+            "text": _words(rng, 250).capitalize() + ".",
+            "image": f"Minimal illustration of {_words(rng, 6)}",
+        }
+
+    @app.post("/v1/messages")
+    async def anthropic_messages(request: Request) -> Response:
+        body = await request.json()
+        failed = await failure("anthropic")
+        if failed is not None:
+            return failed
+        prompt = json.dumps(body.get("messages", []))
+        tools = body.get("tools") or []
+        if tools:
+            # Structured output via tool use (the LangChain agent): fill the tool's schema with words
+            tool = tools[0]
+            props = (tool.get("input_schema") or {}).get("properties", {})
+            values = idea_json(prompt)
+            content: List[Dict[str, Any]] = [{
+                "type": "tool_use",
+                "id": f"toolu_{uuid.uuid4().hex[:20]}",
+                "name": tool.get("name"),
+                "input": {k: values.get(k, _words(rng, 8)) for k in props},
+            }]
+            stop_reason = "tool_use"
+            text = ""
+        else:
+            text = json.dumps(idea_json(prompt)) if "JSON" in str(body.get("system", "")) else _words(rng, 220).capitalize() + "."
+            content = [{"type": "text", "text": text}]
+            stop_reason = "end_turn"
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+        }
+        if not body.get("stream"):
+            await asyncio.sleep(latency("anthropic"))
+            return JSONResponse(message)
+        return StreamingResponse(_anthropic_events(message, text), media_type="text/event-stream")
+
+    async def _anthropic_events(message: Dict[str, Any], text: str) -> AsyncIterator[bytes]:
+        def event(kind: str, data: Dict[str, Any]) -> bytes:
+            return f"event: {kind}\ndata: {json.dumps({'type': kind, **data})}\n\n".encode()
+
+        # Time to first token, then one delta per word
+        await asyncio.sleep(latency("anthropic"))
+        yield event("message_start", {"message": {**message, "content": []}})
+        yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        for piece in text.split(" "):
+            await asyncio.sleep(profiles["anthropic"].token_ms * latency_scale / 1000)
+            yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": piece + " "}})
+        yield event("content_block_stop", {"index": 0})
+        yield event("message_delta", {"delta": {"stop_reason": "end_turn"}, "usage": message["usage"]})
+        yield event("message_stop", {})
+
+    @app.post("/chat/completions")
+    async def perplexity_chat(request: Request) -> Response:
+        body = await request.json()
+        failed = await failure("perplexity")
+        if failed is not None:
+            return failed
+        await asyncio.sleep(latency("perplexity"))
+        return JSONResponse({
+            "id": uuid.uuid4().hex,
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": _words(rng, 300).capitalize() + "."}}],
+        })
+
+    @app.post("/v1/images/generations")
+    async def openai_images(request: Request) -> Response:
+        await request.body()
+        failed = await failure("openai")
+        if failed is not None:
+            return failed
+        await asyncio.sleep(latency("openai"))
+        return JSONResponse({"created": 0, "data": [{"url": f"{str(request.base_url).rstrip('/')}/files/{uuid.uuid4().hex}.jpg"}]})
+
+    @app.get("/files/{name}")
+    async def image_file(name: str) -> Response:
+        failed = await failure("assets")
+        if failed is not None:
+            return failed
+        await asyncio.sleep(latency("assets"))
+        return Response(image, media_type="image/jpeg" if image[:3] == b"\xff\xd8\xff" else "image/png")
+
+    @app.post("/v2/assets")
+    async def linkedin_register(request: Request) -> Response:
+        await request.body()
+        failed = await failure("linkedin")
+        if failed is not None:
+            return failed
+        await asyncio.sleep(latency("linkedin"))
+        asset = f"urn:li:digitalmediaAsset:{uuid.uuid4().hex[:16]}"
+        upload_url = f"{str(request.base_url).rstrip('/')}/upload/{asset}"
+        return JSONResponse({"value": {
+            "asset": asset,
+            "uploadMechanism": {"com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {"uploadUrl": upload_url}},
+        }})
+
+    @app.put("/upload/{asset}")
+    async def linkedin_upload(asset: str, request: Request) -> Response:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+        failed = await failure("linkedin")
+        if failed is not None:
+            return failed
+        await asyncio.sleep(latency("linkedin"))
+        return Response(status_code=201 if size else 400)
+
+    @app.post("/v2/ugcPosts")
+    async def linkedin_share(request: Request) -> Response:
+        await request.body()
+        failed = await failure("linkedin")
+        if failed is not None:
+            return failed
+        await asyncio.sleep(latency("linkedin"))
+        return JSONResponse({"id": f"urn:li:share:{next(ids)}"}, status_code=201)
+
+    @app.post("/oauth/v2/accessToken")
+    async def linkedin_token() -> Response:
+        return JSONResponse({"access_token": f"fake-{uuid.uuid4().hex}", "expires_in": 5184000})
+
+    @app.get("/v2/me")
+    async def linkedin_me() -> Response:
+        return JSONResponse({"id": "fake"})
+
+    @app.get("/_stats")
+    def provider_stats() -> Dict[str, Dict[str, int]]:
+        out: Dict[str, Dict[str, int]] = {}
+        for (provider, outcome), n in sorted(stats.items()):
+            out.setdefault(provider, {})[outcome] = n
+        return out
+
+    return app
+
+
+def parse_profiles(overrides: List[str], error_rate: float, rate_limit_rate: float) -> Dict[str, Profile]:
+    """Defaults with the global rates applied, then ``provider:key=value,...`` overrides."""
+    profiles = {name: replace(p, error_rate=error_rate, rate_limit_rate=rate_limit_rate) for name, p in DEFAULT_PROFILES.items()}
+    for spec in overrides:
+        name, _, params = spec.partition(":")
+        if name not in profiles:
+            raise SystemExit(f"Unknown provider {name!r}; expected one of {', '.join(profiles)}")
+        values = {}
+        for pair in filter(None, params.split(",")):
+            key, _, value = pair.partition("=")
+            if key not in Profile.__dataclass_fields__:
+                raise SystemExit(f"Unknown setting {key!r} in {spec!r}")
+            values[key] = float(value)
+        profiles[name] = replace(profiles[name], **values)
+    return profiles
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve fake Anthropic/Perplexity/OpenAI/LinkedIn APIs locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply every latency (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 500/502/503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--provider", action="append", default=[], metavar="NAME:KEY=VALUE,...",
+                        help="Per-provider override of median_ms, sigma, error_rate, rate_limit_rate or token_ms")
+    parser.add_argument("--seed", type=int, help="Seed for error injection and generated text")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    profiles = parse_profiles(args.provider, args.error_rate, args.rate_limit_rate)
+    for name, p in profiles.items():
+        print(f"{name:<11} median={p.median_ms * args.latency_scale:.0f}ms sigma={p.sigma} "
+              f"5xx={p.error_rate:.1%} 429={p.rate_limit_rate:.1%}", file=sys.stderr)
+    uvicorn.run(create_app(profiles, args.latency_scale, args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
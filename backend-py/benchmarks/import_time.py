@@ -0,0 +1,98 @@
+"""Import-time report for the API process.
+
+Usage (from backend-py/):
+    python benchmarks/import_time.py [--module app.main] [--agent] [--top 25] [--save results.json]
+
+Runs ``python -X importtime`` in a fresh interpreter, so nothing is cached in
+this process, and prints the slowest modules by cumulative and by self time,
+plus self time summed per top-level package. ``--agent`` also imports what the
+agent loads on first use (LangChain/LangGraph), which the startup warm-up
+otherwise pays in the background; GET /ready reports those times for a
+running server.
+"""
+from __future__ import annotations
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# "import time:       123 |       4567 |   package.module" (microseconds, indented by nesting depth)
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(modules: List[str]) -> List[Dict[str, Any]]:
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"Importing {', '.join(modules)} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append({
+                "module": m.group(4),
+                "selfMs": int(m.group(1)) / 1000,
+                "cumulativeMs": int(m.group(2)) / 1000,
+                "depth": (len(m.group(3)) - 1) // 2,
+            })
+    return rows
+
+
+def report(rows: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    by_package: Dict[str, float] = defaultdict(float)
+    for row in rows:
+        by_package[row["module"].split(".")[0]] += row["selfMs"]
+    return {
+        "totalMs": round(sum(r["cumulativeMs"] for r in rows if r["depth"] == 0), 1),
+        "modules": len(rows),
+        "byCumulative": sorted(rows, key=lambda r: r["cumulativeMs"], reverse=True)[:top],
+        "bySelf": sorted(rows, key=lambda r: r["selfMs"], reverse=True)[:top],
+        "byPackage": dict(sorted(((k, round(v, 1)) for k, v in by_package.items()), key=lambda kv: kv[1], reverse=True)[:top]),
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n{result['modules']} modules imported in {result['totalMs']:.0f} ms")
+    for title, key in (("cumulative", "cumulativeMs"), ("self", "selfMs")):
+        print(f"\nslowest by {title} time (ms)")
+        for row in result[f"by{title.capitalize()}"]:
+            print(f"{row[key]:>10.1f}  {row['module']}")
+    print("\nself time by top-level package (ms)")
+    for package, ms in result["byPackage"].items():
+        print(f"{ms:>10.1f}  {package}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report where the API's import time goes.")
+    parser.add_argument("--module", default="app.main", help="Module to import (default app.main)")
+    parser.add_argument("--agent", action="store_true", help="Also import the agent's deferred LangChain/LangGraph modules")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--save", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    modules = [args.module]
+    if args.agent:
+        from app.services.warmup import AGENT_IMPORTS
+
+        modules += list(AGENT_IMPORTS)
+    result = report(measure(modules), args.top)
+    print_report(result)
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        print(f"\nSaved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
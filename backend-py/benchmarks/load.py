@@ -0,0 +1,180 @@
+"""Open-loop load driver for the generate -> validate -> publish path.
+
+Usage (from backend-py/, with the API and benchmarks/fake_providers.py running):
+    python benchmarks/load.py [--base-url http://127.0.0.1:4000] [--rps 2] [--duration 60]
+                              [--publish-ratio 1.0] [--api-key KEY] [--save results.json]
+
+Flows start at a fixed rate whether or not earlier ones have finished, so a slow
+server shows up as latency and errors instead of a lower request rate. Each
+flow generates a draft and waits for its image (the UI does the same before
+validating). It then validates the draft and, for ``--publish-ratio`` of the
+flows, publishes it. The report gives throughput, p50/p90/p99/max latency and
+error rate per step.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+STEPS = ("generate", "image", "validate", "publish")
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, step: str, seconds: float, outcome: str) -> None:
+        self.outcomes[step][outcome] += 1
+        if outcome == "ok":
+            self.latencies[step].append(seconds)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for step in STEPS:
+            outcomes = self.outcomes.get(step)
+            if not outcomes:
+                continue
+            total = sum(outcomes.values())
+            samples = sorted(self.latencies[step])
+            out[step] = {
+                "requests": total,
+                "ok": outcomes["ok"],
+                "throughput": round(outcomes["ok"] / elapsed, 2),
+                "errorRate": round(1 - outcomes["ok"] / total, 4),
+                "errors": {k: v for k, v in outcomes.items() if k != "ok"},
+                **{f"p{q}Ms": _percentile(samples, q / 100) for q in (50, 90, 99)},
+                "maxMs": round(samples[-1] * 1000, 1) if samples else None,
+            }
+        return out
+
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 1)
+
+
+async def _step(rec: Recorder, step: str, call) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    try:
+        resp = await call()
+    except httpx.TimeoutException:
+        rec.add(step, time.perf_counter() - started, "timeout")
+        return None
+    except httpx.HTTPError as e:
+        rec.add(step, time.perf_counter() - started, type(e).__name__)
+        return None
+    rec.add(step, time.perf_counter() - started, "ok" if resp.is_success else str(resp.status_code))
+    return resp if resp.is_success else None
+
+
+async def flow(client: httpx.AsyncClient, rec: Recorder, args: argparse.Namespace) -> None:
+    resp = await _step(rec, "generate", lambda: client.post("/posts/generate", json={"topic": random.choice(args.topics)}))
+    if resp is None:
+        return
+    post = resp.json()
+    post_id = post["id"]
+
+    # The image is attached in the background; poll like the UI until it is no longer pending
+    started = time.perf_counter()
+    while post.get("imageStatus") == "pending":
+        if time.perf_counter() - started > args.image_timeout:
+            rec.add("image", time.perf_counter() - started, "timeout")
+            return
+        await asyncio.sleep(args.poll_interval)
+        try:
+            resp = await client.get(f"/posts/{post_id}")
+        except httpx.HTTPError as e:
+            rec.add("image", time.perf_counter() - started, type(e).__name__)
+            return
+        if not resp.is_success:
+            rec.add("image", time.perf_counter() - started, str(resp.status_code))
+            return
+        post = resp.json()
+    rec.add("image", time.perf_counter() - started, "ok" if post.get("imageUrl") else "failed")
+
+    if await _step(rec, "validate", lambda: client.post(f"/posts/{post_id}/validate")) is None:
+        return
+    if random.random() < args.publish_ratio:
+        await _step(rec, "publish", lambda: client.post(f"/posts/{post_id}/publish"))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    headers = {"x-api-key": args.api_key} if args.api_key else {}
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    rec = Recorder()
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=args.timeout, limits=limits) as client:
+        interval = 1 / args.rps
+        tasks: List[asyncio.Task] = []
+        started = time.perf_counter()
+        for i in range(int(args.rps * args.duration)):
+            # Absolute schedule: a late wake-up does not push back later arrivals
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(flow(client, rec, args)))
+        offered = time.perf_counter() - started
+        print(f"Started {len(tasks)} flows in {offered:.1f}s; waiting for them to finish...", file=sys.stderr)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        providers = None
+        if args.fakes_url:
+            try:
+                providers = (await client.get(f"{args.fakes_url.rstrip('/')}/_stats")).json()
+            except httpx.HTTPError:
+                pass
+    return {
+        "config": {"baseUrl": args.base_url, "rps": args.rps, "duration": args.duration, "publishRatio": args.publish_ratio},
+        "flows": len(tasks),
+        "elapsedS": round(elapsed, 1),
+        "steps": rec.report(elapsed),
+        "providers": providers,
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n{result['flows']} flows at {result['config']['rps']} flows/s, finished in {result['elapsedS']}s")
+    print(f"{'step':<10}{'ok/total':>12}{'ok/s':>9}{'errors':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, s in result["steps"].items():
+        cells = [s[k] if s[k] is not None else "-" for k in ("p50Ms", "p90Ms", "p99Ms", "maxMs")]
+        print(f"{step:<10}{s['ok']:>6}/{s['requests']:<5}{s['throughput']:>9}{s['errorRate']:>9.1%}" + "".join(f"{c:>10}" for c in cells))
+        if s["errors"]:
+            print(f"{'':<10}errors: {', '.join(f'{k}={v}' for k, v in sorted(s['errors'].items()))}")
+    if result.get("providers"):
+        print("\nfake provider calls: " + "; ".join(f"{p} {dict(o)}" for p, o in result["providers"].items()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive generate/validate/publish flows at a fixed rate.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:4000")
+    parser.add_argument("--api-key", help="Sent as x-api-key when the API requires one")
+    parser.add_argument("--rps", type=float, default=2.0, help="New flows started per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to keep starting flows")
+    parser.add_argument("--publish-ratio", type=float, default=1.0, help="Share of validated drafts that are published")
+    parser.add_argument("--topics", nargs="+", default=["data quality", "ml in production", "analytics teams", "experimentation"])
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--image-timeout", type=float, default=120.0, help="Max wait for a draft's image")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--fakes-url", default="http://127.0.0.1:9100", help="fake_providers.py origin for its call stats ('' to skip)")
+    parser.add_argument("--save", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        print(f"\nSaved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()